@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+'''
+Measures how Tokenizer.concatnating_arrays scales with the length of the concat
+chains and with the number of asserts.
+
+    $ python3 bench/bench_concat.py
+'''
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from smt2hr.simplify import Tokenizer
+
+def chain(name, width):
+    '''
+    The serialized form of a width byte read from name, the way pysmt prints it:
+    (a[3_32]::(a[2_32]::(a[1_32]::a[0_32])))
+    '''
+    ret = name + "[0_32]"
+    for i in range(1, width):
+        ret = "(" + name + "[" + str(i) + "_32]::" + ret + ")"
+    return ret
+
+def query(nasserts, width):
+    ret = "(%d_%d = %s)" % (0, width * 8, chain("arr_0", width))
+    for i in range(1, nasserts):
+        ret = "(%s & (%d_%d = %s))" % (ret, i, width * 8, chain("arr_" + str(i), width))
+    return ret
+
+def run(nasserts, width, repeat):
+    string = query(nasserts, width)
+    best = None
+    for _ in range(repeat):
+        # only time the concat stage, the other stages are run by hand
+        tokenizer = Tokenizer("")
+        tokenizer.string = string
+        tokenizer.tokenize()
+        tokenizer.remove_bit_width_from_tokens()
+        tokenizer.intern_tokens()
+        start = time.perf_counter()
+        tokenizer.concatnating_arrays()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    collapsed = all("::" not in token for token in tokenizer.tokens)
+    return len(string), best, collapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--widths", default="4,8,16,32,64,128,256", help="Comma separated chain lengths")
+    parser.add_argument("--asserts", default="1,10,100,1000", help="Comma separated number of asserts")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    args = parser.parse_args()
+
+    print("%8s %8s %12s %12s %10s" % ("asserts", "width", "chars", "time (ms)", "collapsed"))
+    for nasserts in [int(x) for x in args.asserts.split(",")]:
+        for width in [int(x) for x in args.widths.split(",")]:
+            size, elapsed, collapsed = run(nasserts, width, args.repeat)
+            print("%8d %8d %12d %12.3f %10s" % (nasserts, width, size, elapsed * 1000, collapsed))
+
+if __name__ == "__main__":
+    main()
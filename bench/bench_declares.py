@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+'''
+Parse time and peak memory of pysmt and of the native reader as the number of
+unused declarations grows, with and without pruning them before parsing, and of
+the streamed pruning simplify.read_asserts does for pysmt (two passes over the
+file instead of a pruned copy of it).
+
+    $ python3 bench/bench_declares.py
+'''
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pysmt.environment import reset_env
+from pysmt.smtlib.parser import SmtLibParser
+from smt2hr.reader import prune_declarations, read_asserts
+from smt2hr.simplify import read_asserts as streamed_read_asserts
+from generate import query
+
+def pysmt_read(text):
+    reset_env()
+    script = SmtLibParser().get_script(io.StringIO(text))
+    return [cmd.args[0] for cmd in script.filter_by_command_name(["assert"])]
+
+def pysmt_pruned_read(text):
+    return pysmt_read(prune_declarations(text))
+
+def pysmt_streamed_read(text):
+    # from a file, an io.StringIO would hold a copy of the text
+    with tempfile.TemporaryFile("w+") as f:
+        f.write(text)
+        f.seek(0)
+        reset_env()
+        return list(streamed_read_asserts(f))
+
+def native_pruned_read(text):
+    return read_asserts(prune_declarations(text))
+
+def measure(function, text):
+    start = time.perf_counter()
+    function(text)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--asserts", type=int, default=10, help="Asserts of the query")
+    parser.add_argument("--unused", default="0,1000,10000,50000", help="Comma separated numbers of unused declarations")
+    args = parser.parse_args()
+
+    readers = [("pysmt", pysmt_read), ("pysmt+prune", pysmt_pruned_read), ("pysmt+stream", pysmt_streamed_read), ("native", read_asserts), ("native+prune", native_pruned_read)]
+    print("%8s %10s" % ("unused", "bytes") + "".join(" %16s %16s" % (name + " ms", name + " KB") for name, _ in readers))
+    for count in [int(x) for x in args.unused.split(",")]:
+        text = query(args.asserts, unused=count)
+        row = "%8d %10d" % (count, len(text))
+        for _, function in readers:
+            elapsed, peak = measure(function, text)
+            row += " %16.1f %16d" % (elapsed * 1000, peak // 1024)
+        print(row)
+
+if __name__ == "__main__":
+    main()
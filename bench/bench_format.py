@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+'''
+The structured output formats against the text output on a generated query: the
+time to convert it, the size of the output, and the time a consumer takes to load
+the records back (json.loads per line, msgpack.Unpacker when msgpack is installed),
+instead of writing a parser for the rendered text. The sizes are also compared on
+let chains, where the text inlines the shared subterms and the records do not.
+
+    $ python3 bench/bench_format.py --asserts 2000 --width 8
+'''
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pysmt.environment import reset_env
+from smt2hr.simplify import parse
+from smt2hr.tree import iter_records, write_json, write_msgpack
+from bench_shared import let_chain
+from generate import query
+
+def timed(function):
+    reset_env()
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--asserts", type=int, default=2000, help="Number of asserts of the generated query")
+    parser.add_argument("--width", type=int, default=8, help="Bytes per concat chain of the generated asserts")
+    parser.add_argument("--depth", type=int, default=12, help="Depth of the let chains")
+    args = parser.parse_args()
+
+    text = query(args.asserts, width=args.width, depth=3, sharing=0.3)
+    rendered, text_time = timed(lambda: parse(io.StringIO(text)))
+    records, tree_time = timed(lambda: list(iter_records(io.StringIO(text))))
+    if len(records) != args.asserts:
+        print("Expected %d records, got %d" % (args.asserts, len(records)))
+        sys.exit(1)
+
+    out = io.StringIO()
+    write_json(records, out)
+    lines = out.getvalue()
+    start = time.perf_counter()
+    loaded = [json.loads(line) for line in lines.splitlines()]
+    json_load = time.perf_counter() - start
+    if loaded != records:
+        print("The JSON records do not load back")
+        sys.exit(1)
+
+    print("%d asserts" % args.asserts)
+    print("%-10s %10.1f ms convert %10d bytes out" % ("text", text_time * 1000, len(rendered.encode())))
+    print("%-10s %10.1f ms convert %10d bytes out %10.1f ms load" % ("json", tree_time * 1000, len(lines.encode()), json_load * 1000))
+    compare_msgpack(records)
+    compare_let_chains(args.depth)
+
+def compare_msgpack(records):
+    try:
+        import msgpack
+    except ImportError:
+        print("%-10s not installed" % "msgpack")
+        return
+    packed = io.BytesIO()
+    write_msgpack(records, packed)
+    start = time.perf_counter()
+    unpacked = list(msgpack.Unpacker(io.BytesIO(packed.getvalue()), raw=False, strict_map_key=False))
+    msgpack_load = time.perf_counter() - start
+    print("%-10s %10s    convert %10d bytes out %10.1f ms load" % ("msgpack", "", len(packed.getvalue()), msgpack_load * 1000))
+
+def compare_let_chains(depth):
+    chain = let_chain(depth)
+    rendered, text_time = timed(lambda: parse(io.StringIO(chain)))
+    out = io.StringIO()
+    _, tree_time = timed(lambda: write_json(iter_records(io.StringIO(chain)), out))
+    print("let chains of depth %d" % depth)
+    print("%-10s %10.1f ms convert %10d bytes out" % ("text", text_time * 1000, len(rendered.encode())))
+    print("%-10s %10.1f ms convert %10d bytes out" % ("json", tree_time * 1000, len(out.getvalue().encode())))
+
+if __name__ == "__main__":
+    main()
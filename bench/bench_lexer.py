@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+'''
+Times Tokenizer.scan against the reference lexer (tokenize followed by
+remove_bit_width_from_tokens) on the asserts of the test files and on synthetic
+queries. tests/test_lexer.py checks that both produce identical token streams.
+
+    $ python3 bench/bench_lexer.py
+'''
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pysmt.smtlib.parser import SmtLibParser
+from smt2hr.simplify import Tokenizer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def reference_tokens(string):
+    tokenizer = Tokenizer("")
+    tokenizer.string = string
+    tokenizer.tokenize()
+    tokenizer.remove_bit_width_from_tokens()
+    return tokenizer.tokens
+
+def scanned_tokens(string):
+    tokenizer = Tokenizer("")
+    tokenizer.string = string
+    tokenizer.scan()
+    return list(tokenizer.tokens)
+
+def test_strings():
+    for filename in sorted(glob.glob(os.path.join(ROOT, "tests", "*"))):
+        # the fixtures, not the tests next to them
+        if not os.path.isfile(filename) or filename.endswith(".py"):
+            continue
+        with open(filename, "r") as fp:
+            script = SmtLibParser().get_script(fp)
+        for asserts in script.filter_by_command_name(["assert"]):
+            yield os.path.basename(filename), asserts.args[0].serialize()
+
+def synthetic_string(nasserts, width):
+    chain = "arr[0_32]"
+    for i in range(1, width):
+        chain = "(arr[%d_32]::%s)" % (i, chain)
+    ret = "(0_64 = %s)" % chain
+    for i in range(1, nasserts):
+        ret = "(%s & (%d_%d = (%s u%% 129_32)))" % (ret, i, width * 8, chain)
+    return ret
+
+def timed(function, string, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(string)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    args = parser.parse_args()
+
+    inputs = list(test_strings())
+    inputs += [("synthetic %dx%d" % (n, w), synthetic_string(n, w)) for n, w in [(10, 4), (100, 8), (1000, 8), (1000, 32)]]
+
+    print("%-24s %12s %14s %12s %8s" % ("input", "chars", "reference (ms)", "scan (ms)", "speedup"))
+    for name, string in inputs:
+        reference = timed(reference_tokens, string, args.repeat)
+        scan = timed(scanned_tokens, string, args.repeat)
+        print("%-24s %12d %14.3f %12.3f %7.1fx" % (name, len(string), reference * 1000, scan * 1000, reference / scan))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+'''
+Compares TokenPrinter.pretty_print against the original recursive printer
+(split_tokens) on the asserts of the test files, on generated queries and on
+random token lists, the script exits with an error if they differ. It then
+times both on and-chains of growing depth, the recursive one fails past the
+recursion limit.
+
+    $ python3 bench/bench_pretty.py
+'''
+
+import argparse
+import glob
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pysmt.smtlib.parser import SmtLibParser
+from smt2hr.simplify import TokenPrinter, Tokenizer
+from generate import query
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def reference(tokens):
+    printer = TokenPrinter(tokens)
+    # split_tokens returns None when it finds no split, pretty_print then failed
+    # with a TypeError
+    return "" + printer.split_tokens(tokens.copy())
+
+def random_tokens(rng, depth):
+    '''
+    A random token list with the nested ( ( ... ) rest ) shapes the printer
+    splits on, and a few stray parens.
+    '''
+    if depth == 0 or rng.random() < 0.2:
+        return [rng.choice(["x", "y[3:0]", "5", "u<", "&", "(", ")"])] if rng.random() < 0.1 else [rng.choice(["x", "y[3:0]", "5"])]
+    tokens = ["("]
+    for _ in range(rng.randrange(1, 4)):
+        if rng.random() < 0.6:
+            tokens += random_tokens(rng, depth - 1)
+        else:
+            tokens.append(rng.choice(["&", "|", "u<", "=", "*"]))
+    tokens.append(")")
+    return tokens
+
+def inputs(count, seed):
+    for filename in sorted(glob.glob(os.path.join(ROOT, "tests", "*"))):
+        # the fixtures, not the tests next to them
+        if not os.path.isfile(filename) or filename.endswith(".py"):
+            continue
+        with open(filename, "r") as f:
+            for cmd in SmtLibParser().get_script(f).filter_by_command_name(["assert"]):
+                yield list(Tokenizer(cmd.args[0].serialize()).tokens)
+    for cmd in SmtLibParser().get_script(io.StringIO(query(200, depth=4, sharing=0.3))).filter_by_command_name(["assert"]):
+        yield list(Tokenizer(cmd.args[0].serialize()).tokens)
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield random_tokens(rng, rng.randrange(1, 8))
+
+def and_chain(depth):
+    '''
+    The tokens of (((c0 & c1) & c2) ... & cN), the shape of a long path condition.
+    '''
+    tokens = ["("] * depth + ["(", "x", "u<", "0", ")"]
+    for i in range(1, depth + 1):
+        tokens += ["&", "(", "x", "u<", str(i), ")", ")"]
+    return tokens
+
+def timed(function, tokens):
+    start = time.perf_counter()
+    try:
+        function(tokens)
+    except RecursionError:
+        return None
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--random", type=int, default=20000, help="Number of random token lists")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--depths", default="10,100,500,2000,10000,100000", help="Comma separated and-chain depths")
+    args = parser.parse_args()
+
+    checked = 0
+    for tokens in inputs(args.random, args.seed):
+        try:
+            expected = reference(tokens)
+        except (RecursionError, TypeError, IndexError):
+            # the reference fails on some unbalanced random lists
+            continue
+        got = TokenPrinter(tokens).pretty_print()
+        if got != expected:
+            print("MISMATCH on %r:\n%r\n%r" % (tokens, expected, got))
+            sys.exit(1)
+        checked += 1
+    print("%d token lists print the same" % checked)
+
+    print("%10s %12s %16s %16s" % ("depth", "tokens", "recursive (ms)", "iterative (ms)"))
+    for depth in [int(x) for x in args.depths.split(",")]:
+        tokens = and_chain(depth)
+        # past the recursion limit the reference only copies the tokens once per
+        # level until it fails, which takes gigabytes on the deep chains
+        old = timed(reference, tokens) if depth < sys.getrecursionlimit() else None
+        new = timed(lambda tokens: TokenPrinter(tokens).pretty_print(), tokens)
+        print("%10d %12d %16s %16.2f" % (depth, len(tokens), "RecursionError" if old is None else "%.2f" % (old * 1000), new * 1000))
+
+if __name__ == "__main__":
+    main()
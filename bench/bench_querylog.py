@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+'''
+Time to get at one query of a large solver log with QueryLog: the first open scans
+the log and writes the sidecar index, later opens only load the index. Compared
+with reading the whole log and splitting it, which is what converting a single
+query costs without the index.
+
+    $ python3 bench/bench_querylog.py --size 200
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from smt2hr.querylog import QueryLog
+from generate import query
+
+def write_log(path, size):
+    '''
+    Writes generated queries one after the other up to size bytes, returns the
+    number of queries.
+    '''
+    count = 0
+    written = 0
+    with open(path, "w") as f:
+        while written < size:
+            text = query(20, width=4, depth=2, seed=count) + "(check-sat)\n(exit)\n"
+            f.write(text)
+            written += len(text)
+            count += 1
+    return count
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def split_all(path, n):
+    with open(path, "r") as f:
+        return ("\n" + f.read()).split("\n(set-logic")[n + 1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200, help="Size of the generated log in MB")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "all-queries.smt2")
+        count = write_log(path, args.size * 1024 * 1024)
+        middle = count // 2
+        print("%d queries, %.1f MB" % (count, os.path.getsize(path) / 1024 / 1024))
+
+        def open_query():
+            with QueryLog(path) as log:
+                return log.query(middle)
+
+        scanned, text = timed(open_query)
+        indexed, indexed_text = timed(open_query)
+        whole, split_text = timed(lambda: split_all(path, middle))
+        assert text == indexed_text == "(set-logic" + split_text + "\n"
+        print("%-32s %10.1f ms" % ("scan and write the index", scanned * 1000))
+        print("%-32s %10.1f ms" % ("load the index", indexed * 1000))
+        print("%-32s %10.1f ms" % ("read and split the whole log", whole * 1000))
+        print("%-32s %10d KB" % ("index size", os.path.getsize(path + ".idx") // 1024))
+
+if __name__ == "__main__":
+    main()
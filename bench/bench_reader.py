@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+'''
+Parse time and peak memory of the native reader against pysmt's SmtLibParser, on
+the test files and on larger synthetic KLEE style queries.
+
+    $ python3 bench/bench_reader.py
+'''
+
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pysmt.environment import reset_env
+from pysmt.smtlib.parser import SmtLibParser
+from smt2hr.reader import read_asserts
+from generate import query
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def pysmt_read(text):
+    reset_env()
+    script = SmtLibParser().get_script(io.StringIO(text))
+    return [cmd.args[0] for cmd in script.filter_by_command_name(["assert"])]
+
+def native_read(text):
+    return read_asserts(text)
+
+def measure(function, text):
+    '''
+    Returns the time taken and the peak memory allocated by function(text).
+    '''
+    start = time.perf_counter()
+    function(text)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--asserts", default="100,1000,10000", help="Comma separated sizes of the synthetic queries")
+    args = parser.parse_args()
+
+    inputs = []
+    for filename in sorted(glob.glob(os.path.join(ROOT, "tests", "*"))):
+        # the fixtures, not the tests next to them
+        if not os.path.isfile(filename) or filename.endswith(".py"):
+            continue
+        with open(filename, "r") as f:
+            inputs.append((os.path.basename(filename), f.read()))
+    for nasserts in [int(x) for x in args.asserts.split(",")]:
+        inputs.append(("synthetic %d" % nasserts, query(nasserts)))
+
+    print("%-18s %10s %12s %12s %8s %12s %12s" % ("input", "bytes", "pysmt (ms)", "native (ms)", "speedup", "pysmt (KB)", "native (KB)"))
+    for name, text in inputs:
+        pysmt_time, pysmt_peak = measure(pysmt_read, text)
+        native_time, native_peak = measure(native_read, text)
+        print("%-18s %10d %12.1f %12.1f %7.1fx %12d %12d" % (
+            name, len(text), pysmt_time * 1000, native_time * 1000, pysmt_time / native_time,
+            pysmt_peak // 1024, native_peak // 1024))
+
+if __name__ == "__main__":
+    main()
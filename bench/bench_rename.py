@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+'''
+Renaming the symbols of large outputs with large maps: Renamer, one scan of the
+output, against a str.replace over the whole output per entry of the map. The
+output is a generated query rendered and repeated up to each size, the map renames
+its arrays and has unused entries up to each map size.
+
+    $ python3 bench/bench_rename.py --sizes 1,10 --entries 100,1000,10000
+'''
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from smt2hr.rename import Renamer
+from smt2hr.simplify import parse
+from generate import query
+
+def rendered_output(size, arrays):
+    '''
+    A rendered query, with its asserts repeated up to size bytes.
+    '''
+    text = parse(io.StringIO(query(1000, width=4, depth=3, arrays=arrays, sharing=0.3)))
+    return "\n\n".join([text] * max(1, size // len(text)))
+
+def mapping(entries, arrays):
+    '''
+    A map renaming the arrays of the generated queries (arr_0, arr_1, ...), and unused
+    MAGMA style names up to entries.
+    '''
+    names = dict(("arr_%d" % i, "buffer_%d" % i) for i in range(arrays))
+    for i in range(len(names), entries):
+        names["MAGMA_png_read_chunk_header_arg_0->.%d:field_%d" % (i, i)] = "field_%d" % i
+    return names
+
+def replace_all(text, names):
+    # longest first, so that a name is not renamed inside a longer one that comes later
+    for name in sorted(names, key=len, reverse=True):
+        text = text.replace(name, names[name])
+    return text
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,10", help="Comma separated output sizes in MB")
+    parser.add_argument("--entries", default="100,1000,10000", help="Comma separated map sizes")
+    parser.add_argument("--arrays", type=int, default=64, help="Arrays of the generated queries")
+    parser.add_argument("--max-replace", type=int, default=10000, help="Skip str.replace when entries times MB is over this")
+    args = parser.parse_args()
+
+    print("%8s %8s %16s %16s" % ("MB", "entries", "str.replace (s)", "Renamer (s)"))
+    for size in [int(x) for x in args.sizes.split(",")]:
+        text = rendered_output(size * 1024 * 1024, args.arrays)
+        for entries in [int(x) for x in args.entries.split(",")]:
+            names = mapping(entries, args.arrays)
+            start = time.perf_counter()
+            renamed = Renamer(names).rename(text)
+            elapsed = time.perf_counter() - start
+            if "arr_1[" in renamed or "buffer_1[" not in renamed:
+                print("Renamer left symbols behind")
+                sys.exit(1)
+            replaced = "-"
+            if entries * size <= args.max_replace:
+                start = time.perf_counter()
+                replace_all(text, names)
+                replaced = "%.2f" % (time.perf_counter() - start)
+            print("%8.1f %8d %16s %16.2f" % (len(text) / 1024 / 1024, entries, replaced, elapsed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+'''
+Per query latency of a warm `smtconv --serve` against cold `smtconv` invocations.
+
+    $ python3 bench/bench_server.py
+'''
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SMTCONV = os.path.join(ROOT, "bin", "smtconv")
+
+def environment():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+def cold(filename, count):
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, SMTCONV, "-s", filename], check=True, stdout=subprocess.DEVNULL, env=environment())
+        times.append(time.perf_counter() - start)
+    return times
+
+def warm(path, filename, count):
+    with open(filename, "r") as f:
+        text = f.read()
+    times = []
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        responses = sock.makefile("r")
+        for i in range(count):
+            start = time.perf_counter()
+            sock.sendall(json.dumps({"id": i, "text": text}).encode() + b"\n")
+            response = json.loads(responses.readline())
+            times.append(time.perf_counter() - start)
+            if not response["ok"]:
+                raise RuntimeError(response["error"])
+    return times
+
+def start_server(path, jobs):
+    server = subprocess.Popen([sys.executable, SMTCONV, "--serve", path, "-j", str(jobs)], env=environment())
+    for _ in range(300):
+        if os.path.exists(path):
+            return server
+        time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("smtconv --serve did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("filenames", nargs="*", default=[os.path.join(ROOT, "tests", name) for name in ["sample.smt2", "sample2.smt2", "stiched"]])
+    parser.add_argument("--count", type=int, default=10, help="Queries per file")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes of the server")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "smtconv.sock")
+    server = start_server(path, args.jobs)
+    try:
+        print("%-16s %10s %16s %16s %9s" % ("file", "bytes", "cold (ms)", "warm (ms)", "speedup"))
+        for filename in args.filenames:
+            cold_times = cold(filename, args.count)
+            warm_times = warm(path, filename, args.count)
+            print("%-16s %10d %8.1f ±%6.1f %8.2f ±%6.2f %8.1fx" % (
+                os.path.basename(filename), os.path.getsize(filename),
+                statistics.median(cold_times) * 1000, statistics.pstdev(cold_times) * 1000,
+                statistics.median(warm_times) * 1000, statistics.pstdev(warm_times) * 1000,
+                statistics.median(cold_times) / statistics.median(warm_times)))
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
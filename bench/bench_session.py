@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+'''
+Converting the successive queries of a run, where every query repeats the asserts
+of the one before it and adds one, from scratch (a parse per file) and with a
+Session, which only converts the new asserts and outputs the deltas. The queries
+are prefixes of a generated query.
+
+    $ python3 bench/bench_session.py --queries 200
+'''
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pysmt.environment import reset_env
+from smt2hr.reader import split_commands
+from smt2hr.session import Session
+from smt2hr.simplify import parse
+from generate import query
+
+def successive_queries(count, width):
+    '''
+    The texts of count queries, the i-th one with the first i + 1 asserts.
+    '''
+    text = query(count, width=width, depth=3, sharing=0.3)
+    commands = split_commands(text)
+    header = "\n".join(text[start:end] for name, start, end in commands if name != "assert")
+    asserts = [text[start:end] for name, start, end in commands if name == "assert"]
+    return [header + "\n" + "\n".join(asserts[:i + 1]) + "\n(check-sat)\n" for i in range(count)]
+
+def from_scratch(queries):
+    outputs = []
+    for text in queries:
+        reset_env()
+        outputs.append(parse(io.StringIO(text)))
+    return outputs
+
+def with_session(queries):
+    session = Session()
+    return [session.update(text) for text in queries]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200, help="Number of successive queries")
+    parser.add_argument("--width", type=int, default=4, help="Bytes per concat chain of the generated asserts")
+    args = parser.parse_args()
+
+    queries = successive_queries(args.queries, args.width)
+    start = time.perf_counter()
+    outputs = from_scratch(queries)
+    scratch = time.perf_counter() - start
+    start = time.perf_counter()
+    deltas = with_session(queries)
+    session = time.perf_counter() - start
+
+    # the added constraints of the session are the output of the last query
+    added = [rendered for delta in deltas for rendered in delta.added]
+    if "\n\n".join(added) != outputs[-1]:
+        print("The deltas do not add up to the last query")
+        sys.exit(1)
+    print("%d queries, %d asserts in the last one" % (len(queries), len(added)))
+    print("%-24s %10.1f ms %10d chars out" % ("from scratch", scratch * 1000, sum(len(output) for output in outputs)))
+    print("%-24s %10.1f ms %10d chars out" % ("session", session * 1000,
+                                               sum(len("\n".join(delta.lines())) for delta in deltas)))
+
+if __name__ == "__main__":
+    main()
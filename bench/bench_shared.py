@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+'''
+Output size and conversion time of the shared engine against the tokenizer and
+dag engines, which inline every shared subterm. The queries are KLEE style let
+chains where every binding uses the one before it twice, so the inlined output
+doubles with every level while the DAG only grows by one node.
+
+    $ python3 bench/bench_shared.py --depths 4,8,12,16
+'''
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pysmt.environment import reset_env
+from smt2hr.simplify import parse
+
+OPERATORS = ["bvadd", "bvmul", "bvxor", "bvsub"]
+
+def let_chain(depth, asserts=4):
+    '''
+    A query of asserts over ?B1 = a + a, ?B2 = ?B1 * ?B1, ... down to ?B<depth>.
+    '''
+    lines = ["(set-logic QF_AUFBV )",
+             "(declare-fun a () (Array (_ BitVec 32) (_ BitVec 8) ) )"]
+    value = "(concat (select a (_ bv1 32) ) (select a (_ bv0 32) ) )"
+    for i in range(asserts):
+        expression = "?B%d" % depth
+        for level in range(depth, 0, -1):
+            previous = "?B%d" % (level - 1) if level > 1 else value
+            expression = "(let ( (?B%d (%s %s %s ) ) ) %s )" % (
+                level, OPERATORS[level % len(OPERATORS)], previous, previous, expression)
+        lines.append("(assert (bvult (_ bv%d 16) %s ) )" % (i, expression))
+    return "\n".join(lines) + "\n"
+
+def convert(text, engine):
+    reset_env()
+    start = time.perf_counter()
+    output = parse(io.StringIO(text), engine=engine)
+    return time.perf_counter() - start, len(output)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depths", default="4,8,12,16", help="Comma separated let chain depths")
+    parser.add_argument("--asserts", type=int, default=4, help="Asserts per query, all over the same chain")
+    args = parser.parse_args()
+
+    engines = ["tokenizer", "dag", "shared"]
+    print("%6s %10s" % ("depth", "input") + "".join(" %12s %10s" % (engine + " (ms)", "chars") for engine in engines))
+    for depth in [int(x) for x in args.depths.split(",")]:
+        text = let_chain(depth, args.asserts)
+        line = "%6d %10d" % (depth, len(text))
+        for engine in engines:
+            elapsed, size = convert(text, engine)
+            line += " %12.1f %10d" % (elapsed * 1000, size)
+        print(line)
+
+if __name__ == "__main__":
+    main()
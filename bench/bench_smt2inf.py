@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+'''
+Time of smt2inf.AssertStmt on the asserts of generated queries, and on serialized
+let chains of growing length (.def_N = .def_N-1 + 1), the shape pysmt gives long
+path constraints once their subterms are bound by lets.
+
+    $ python3 bench/bench_smt2inf.py --lengths 100,1000,10000,100000
+'''
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pysmt.smtlib.parser import SmtLibParser
+from smt2hr.smt2inf import AssertStmt
+from generate import query
+
+def let_chain(length):
+    '''
+    (assert (let ((.def_0 (select a #b0...))) (let ((.def_1 (bvadd .def_0 #b1)) ... (= .def_N #b0))))
+    '''
+    parts = ["(assert (let ((.def_0 (select a #b00000000000000000000000000000000)))"]
+    for i in range(1, length):
+        parts.append(" (let ((.def_%d (bvadd .def_%d #b00000001)))" % (i, i - 1))
+    parts.append(" (= .def_%d #b00000000)" % (length - 1))
+    parts.append(")" * (length + 1))
+    return "".join(parts)
+
+def convert(serialized):
+    stmt = AssertStmt("ASSERT", serialized)
+    return stmt.parse_stmt()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--asserts", type=int, default=1000, help="Asserts of the generated query")
+    parser.add_argument("--lengths", default="100,1000,10000,100000", help="Comma separated let chain lengths")
+    args = parser.parse_args()
+
+    script = SmtLibParser().get_script(io.StringIO(query(args.asserts, width=8, depth=4, sharing=0.3)))
+    serialized = [cmd.serialize_to_string() for cmd in script.filter_by_command_name(["assert"])]
+    start = time.perf_counter()
+    for string in serialized:
+        convert(string)
+    elapsed = time.perf_counter() - start
+    print("%d generated asserts: %.1f ms, %.1f us per assert" % (len(serialized), elapsed * 1000, elapsed * 1e6 / len(serialized)))
+
+    print("%10s %12s %12s" % ("lets", "chars", "time (ms)"))
+    for length in [int(x) for x in args.lengths.split(",")]:
+        string = let_chain(length)
+        start = time.perf_counter()
+        convert(string)
+        print("%10d %12d %12.1f" % (length, len(string), (time.perf_counter() - start) * 1000))
+
+if __name__ == "__main__":
+    main()
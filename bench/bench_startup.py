@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+'''
+Cold start latency of smtconv: the wall time of --version, --help, a tiny file and
+a large generated file (median of --runs runs), and the slowest top level imports
+of each one as reported by python -X importtime. --help and --version must not
+import pysmt, the benchmark fails if they do.
+
+    $ python3 bench/bench_startup.py --runs 10 --asserts 2000
+'''
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SMTCONV = os.path.join(ROOT, "bin", "smtconv")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate import query
+
+def environment():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+def wall_time(args, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, SMTCONV] + args, check=True, stdout=subprocess.DEVNULL, env=environment())
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def imports(args):
+    '''
+    Returns {module: cumulative microseconds} of the top level imports of one run,
+    and the names of all the modules it imported.
+    '''
+    result = subprocess.run([sys.executable, "-X", "importtime", SMTCONV] + args, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=environment(), text=True)
+    modules = {}
+    names = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        names.add(name.strip())
+        # top level imports are not indented
+        if not name.startswith("  "):
+            modules[name.strip()] = int(cumulative)
+    return modules, names
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Runs per command, the median is reported")
+    parser.add_argument("--asserts", type=int, default=2000, help="Number of asserts of the large file")
+    parser.add_argument("--top", type=int, default=3, help="Slowest top level imports shown per command")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        tiny = os.path.join(directory, "tiny.smt2")
+        large = os.path.join(directory, "large.smt2")
+        with open(tiny, "w") as f:
+            f.write(query(1, width=4, depth=1))
+        with open(large, "w") as f:
+            f.write(query(args.asserts, width=8, depth=3, sharing=0.3))
+
+        commands = [("--version", ["--version"]), ("--help", ["--help"]),
+                    ("tiny file", ["-s", tiny]), ("large file", ["-s", large])]
+        failed = False
+        for label, command in commands:
+            seconds = wall_time(command, args.runs)
+            modules, names = imports(command)
+            slowest = sorted(modules.items(), key=lambda item: -item[1])[:args.top]
+            print("%-12s %8.1f ms  %s" % (label, seconds * 1000,
+                                          ", ".join("%s %.1f ms" % (name, us / 1000) for name, us in slowest)))
+            if command[0].startswith("--") and any(name.startswith("pysmt") for name in names):
+                print("%s imports pysmt" % label)
+                failed = True
+        sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+'''
+Times every stage of the conversion on generated queries (see generate.py) and
+records the peak memory, the results can be saved as JSON and compared with the
+results of an earlier version to catch regressions.
+
+    $ python3 bench/bench_suite.py --output before.json
+    $ python3 bench/bench_suite.py --compare before.json
+
+The stages of simplify.parse are timed one at a time over all the asserts, with
+the reference lexer (tokenize and remove_bit_width_from_tokens) as well as scan,
+which replaces both. native and dag are the other reader and engine, smt2inf is
+the parse_declares and parse_asserts path over the pysmt script.
+'''
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pysmt
+from pysmt.environment import reset_env
+from pysmt.smtlib.parser import SmtLibParser
+from smt2hr import smt2inf
+from smt2hr.dag import DagSimplifier
+from smt2hr.reader import prune_declarations, read_asserts
+from smt2hr.simplify import Tokenizer, parse
+from smt2hr.tokens import SymbolTable
+from generate import query
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+STAGES = ["parse", "serialize", "tokenize", "bit_width", "intern", "concat", "parens", "render", "pretty",
+          "scan", "native", "dag", "smt2inf"]
+PARAMETERS = ["asserts", "width", "depth", "arrays", "sharing"]
+
+def empty_tokenizer(string, symbols):
+    tokenizer = Tokenizer("", symbols=symbols)
+    tokenizer.string = string
+    return tokenizer
+
+def run_stages(text):
+    '''
+    Runs the stages once, returns the time of each one, the number of tokens and
+    the error of smt2inf if it can not convert the query.
+    '''
+    times = {}
+
+    def timed(stage, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        times[stage] = time.perf_counter() - start
+        return result
+
+    reset_env()
+    script = timed("parse", lambda: SmtLibParser().get_script(io.StringIO(prune_declarations(text))))
+    formulas = [cmd.args[0] for cmd in script.filter_by_command_name(["assert"])]
+    strings = timed("serialize", lambda: [formula.serialize() for formula in formulas])
+
+    # one symbol table for the asserts of the query, like iter_parse
+    symbols = SymbolTable()
+    tokenizers = [empty_tokenizer(string, symbols) for string in strings]
+    timed("tokenize", lambda: [tokenizer.tokenize() for tokenizer in tokenizers])
+    timed("bit_width", lambda: [tokenizer.remove_bit_width_from_tokens() for tokenizer in tokenizers])
+    timed("intern", lambda: [tokenizer.intern_tokens() for tokenizer in tokenizers])
+    timed("concat", lambda: [tokenizer.concatnating_arrays() for tokenizer in tokenizers])
+    timed("parens", lambda: [tokenizer.remove_uneeded_parens() for tokenizer in tokenizers])
+    timed("render", lambda: [tokenizer.tokens_to_string() for tokenizer in tokenizers])
+    timed("pretty", lambda: [tokenizer.pretty_print() for tokenizer in tokenizers])
+    tokens = sum(len(tokenizer.tokens) for tokenizer in tokenizers)
+
+    symbols = SymbolTable()
+    scanners = [empty_tokenizer(string, symbols) for string in strings]
+    timed("scan", lambda: [tokenizer.scan() for tokenizer in scanners])
+    timed("native", read_asserts, prune_declarations(text))
+    simplifier = DagSimplifier()
+    timed("dag", lambda: [simplifier.simplify(formula).tokens_to_string() for formula in formulas])
+
+    error = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            timed("smt2inf", smt2inf_path, script)
+    except Exception as e:
+        times.pop("smt2inf", None)
+        error = "%s: %s" % (type(e).__name__, e)
+    return times, tokens, error
+
+def smt2inf_path(script):
+    smt2inf.parse_declares(script.filter_by_command_name(["declare-fun"]))
+    smt2inf.parse_asserts(script.filter_by_command_name(["assert"]))
+
+def peak_memory(function):
+    '''
+    Peak of the memory allocated by function, in KB.
+    '''
+    reset_env()
+    tracemalloc.start()
+    try:
+        function()
+    except Exception:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak // 1024
+
+def run_case(case, repeat):
+    text = query(**case)
+    best = {}
+    for _ in range(repeat):
+        times, tokens, error = run_stages(text)
+        for stage, elapsed in times.items():
+            best[stage] = min(best.get(stage, elapsed), elapsed)
+
+    def smt2inf_file():
+        script = SmtLibParser().get_script(io.StringIO(prune_declarations(text)))
+        with contextlib.redirect_stdout(io.StringIO()):
+            smt2inf_path(script)
+
+    result = dict(case)
+    result["bytes"] = len(text)
+    result["tokens"] = tokens
+    result["stages"] = best
+    result["peak_kb"] = {"parse": peak_memory(lambda: parse(io.StringIO(text))),
+                         "native": peak_memory(lambda: parse(io.StringIO(text), reader="native")),
+                         "smt2inf": peak_memory(smt2inf_file)}
+    result["smt2inf_error"] = error
+    return result
+
+def case_key(case):
+    return tuple(case[name] for name in PARAMETERS)
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_case(result):
+    print("%7d %5d %5d %6d %7.2f %9d" % tuple([result[name] for name in PARAMETERS] + [result["tokens"]]) +
+          "".join(" %9.1f" % (result["stages"][stage] * 1000) if stage in result["stages"] else " %9s" % "-"
+                  for stage in STAGES) +
+          " %9d" % result["peak_kb"]["parse"])
+
+def compare(results, baseline, threshold, min_time):
+    '''
+    Prints the stages that got slower than threshold times their baseline, returns
+    whether there were any.
+    '''
+    old_cases = dict((case_key(case), case) for case in baseline["cases"])
+    regressions = 0
+    print()
+    print("Compared with %s (%s):" % (baseline.get("commit") or "baseline", baseline.get("date", "")))
+    for result in results:
+        old = old_cases.get(case_key(result))
+        if old is None:
+            continue
+        for stage in STAGES:
+            if stage not in result["stages"] or stage not in old["stages"] or old["stages"][stage] < min_time:
+                continue
+            ratio = result["stages"][stage] / old["stages"][stage]
+            if ratio > threshold:
+                regressions += 1
+                print("  REGRESSION %-40s %-10s %9.1f ms -> %9.1f ms (%.2fx)" % (
+                    " ".join("%s=%s" % (name, result[name]) for name in PARAMETERS), stage,
+                    old["stages"][stage] * 1000, result["stages"][stage] * 1000, ratio))
+        for name, peak in result["peak_kb"].items():
+            if old["peak_kb"].get(name) and peak / old["peak_kb"][name] > threshold:
+                regressions += 1
+                print("  REGRESSION %-40s %-10s %9d KB -> %9d KB (%.2fx)" % (
+                    " ".join("%s=%s" % (name, result[name]) for name in PARAMETERS), "peak " + name,
+                    old["peak_kb"][name], peak, peak / old["peak_kb"][name]))
+    print("%d regressions over %.2fx" % (regressions, threshold))
+    return regressions > 0
+
+def int_list(value):
+    return [int(x) for x in value.split(",")]
+
+def float_list(value):
+    return [float(x) for x in value.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--asserts", type=int_list, default=[100, 1000], help="Comma separated numbers of asserts")
+    parser.add_argument("--widths", type=int_list, default=[4, 8, 16], help="Comma separated concat chain widths in bytes")
+    parser.add_argument("--depths", type=int_list, default=[2], help="Comma separated let nesting depths")
+    parser.add_argument("--arrays", type=int_list, default=[8], help="Comma separated numbers of arrays")
+    parser.add_argument("--sharing", type=float_list, default=[0.0, 0.5], help="Comma separated shares of reused reads")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    parser.add_argument("--output", "-o", default=None, help="Save the results to this JSON file")
+    parser.add_argument("--compare", "-c", default=None, help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown reported as a regression")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Stages faster than this many ms in the baseline are not compared")
+    args = parser.parse_args()
+
+    print("%7s %5s %5s %6s %7s %9s" % ("asserts", "width", "depth", "arrays", "sharing", "tokens") +
+          "".join(" %9s" % stage for stage in STAGES) + " %9s" % "peak KB")
+    results = []
+    errors = set()
+    for values in itertools.product(args.asserts, args.widths, args.depths, args.arrays, args.sharing):
+        result = run_case(dict(zip(PARAMETERS, values)), args.repeat)
+        print_case(result)
+        if result["smt2inf_error"]:
+            errors.add(result["smt2inf_error"])
+        results.append(result)
+    print("(times in ms, best of %d)" % args.repeat)
+    for error in sorted(errors):
+        print("smt2inf failed: " + error)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"commit": commit(), "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                       "python": platform.python_version(), "pysmt": pysmt.__version__,
+                       "repeat": args.repeat, "cases": results}, f, indent=1)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold, args.min_time / 1000):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
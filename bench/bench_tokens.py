@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+'''
+Time and peak memory of the Tokenizer passes and of the printers on very large
+serialized asserts, the conjunction of generated asserts repeated up to each size.
+
+    $ python3 bench/bench_tokens.py --sizes 1,10,50
+'''
+
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pysmt.smtlib.parser import SmtLibParser
+from smt2hr.simplify import Tokenizer
+from generate import query
+
+def large_assert(size, width):
+    '''
+    A serialized and of generated asserts, about size bytes long.
+    '''
+    script = SmtLibParser().get_script(io.StringIO(query(1000, width=width, depth=3, sharing=0.3)))
+    strings = [cmd.args[0].serialize() for cmd in script.filter_by_command_name(["assert"])]
+    chunk = sum(len(string) + 3 for string in strings)
+    strings = strings * max(1, size // chunk)
+    return "(" + " & ".join(strings) + ")"
+
+def run(string):
+    '''
+    Returns the time of the Tokenizer, of tokens_to_string and of pretty_print, and
+    the peak memory of the Tokenizer.
+    '''
+    start = time.perf_counter()
+    tokenizer = Tokenizer(string)
+    tokenized = time.perf_counter()
+    tokenizer.tokens_to_string()
+    rendered = time.perf_counter()
+    tokenizer.pretty_print()
+    printed = time.perf_counter()
+    count = len(tokenizer.tokens)
+    del tokenizer
+
+    tracemalloc.start()
+    tokenizer = Tokenizer(string)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, tokenized - start, rendered - tokenized, printed - rendered, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,10,50", help="Comma separated sizes of the assert in MB")
+    parser.add_argument("--width", type=int, default=4, help="Bytes per concat chain of the generated asserts")
+    args = parser.parse_args()
+
+    print("%8s %10s %14s %14s %14s %14s" % ("MB", "tokens", "tokenizer (s)", "render (s)", "pretty (s)", "peak (MB)"))
+    for size in [int(x) for x in args.sizes.split(",")]:
+        string = large_assert(size * 1024 * 1024, args.width)
+        count, tokenized, rendered, printed, peak = run(string)
+        print("%8.1f %10d %14.2f %14.2f %14.2f %14.1f" % (
+            len(string) / 1024 / 1024, count, tokenized, rendered, printed, peak / 1024 / 1024))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+'''
+Generates KLEE style SMT-LIB queries: byte arrays, asserts reading width bytes
+with concat/select chains, let bindings nested depth deep over the reads, and a
+share of the asserts reusing reads of earlier asserts.
+
+    $ python3 bench/generate.py --asserts 1000 --width 8 --depth 4 > query.smt2
+'''
+
+import argparse
+import random
+import sys
+
+OPERATORS = ["bvadd", "bvsub", "bvmul", "bvurem", "bvand", "bvor"]
+COMPARISONS = ["bvult", "bvule", "bvslt", "bvsle", "="]
+
+def read_chain(array, offset, width):
+    '''
+    (concat (select a (_ bv3 32)) (concat (select a (_ bv2 32)) ...)), the way KLEE
+    reads width bytes of a little endian value.
+    '''
+    ret = "(select %s (_ bv%d 32) )" % (array, offset)
+    for i in range(1, width):
+        ret = "(concat (select %s (_ bv%d 32) ) %s )" % (array, offset + i, ret)
+    return ret
+
+def level(rng, bits, previous):
+    '''
+    One let bound step over the previous binding, sometimes the sign extend,
+    multiply and extract KLEE emits for pointer arithmetic.
+    '''
+    if rng.random() < 0.2:
+        return "((_ extract %d 0) (bvmul (_ bv4 %d) ((_ sign_extend %d) %s ) ) )" % (bits - 1, bits * 2, bits, previous)
+    return "(%s %s (_ bv%d %d) )" % (rng.choice(OPERATORS), previous, rng.randrange(1, 256), bits)
+
+def query(asserts=100, width=4, depth=2, arrays=8, sharing=0.0, unused=0, seed=0):
+    '''
+    Returns the text of a query.
+
+    :param asserts: Number of asserts.
+    :param width: Bytes read by each concat chain.
+    :param depth: Number of nested lets over the reads of each assert.
+    :param arrays: Number of arrays the asserts read from.
+    :param sharing: Share of the asserts that reuse the read of an earlier assert.
+    :param unused: Number of extra arrays that are declared and never read.
+    :param seed: Seed of the random choices.
+    '''
+    rng = random.Random(seed)
+    bits = width * 8
+    lines = ["(set-logic QF_AUFBV )"]
+    for i in range(arrays):
+        lines.append("(declare-fun arr_%d () (Array (_ BitVec 32) (_ BitVec 8) ) )" % i)
+    for i in range(unused):
+        lines.append("(declare-fun |MAGMA_arg_%d->.%d:data_NullOpt| () (Array (_ BitVec 32) (_ BitVec 8) ) )" % (i // 16, i))
+
+    reads = []
+    for i in range(asserts):
+        if reads and rng.random() < sharing:
+            read = rng.choice(reads)
+        else:
+            read = read_chain("arr_%d" % rng.randrange(arrays), rng.randrange(64) * width, width)
+            reads.append(read)
+        text = "(%s ?B%d (_ bv%d %d) )" % (rng.choice(COMPARISONS), depth + 1, rng.randrange(2 ** min(bits, 16)), bits)
+        if rng.random() < 0.5:
+            text = "(= false %s )" % text
+        bindings = [read] + [level(rng, bits, "?B%d" % j) for j in range(1, depth + 1)]
+        for j in reversed(range(len(bindings))):
+            text = "(let ( (?B%d %s ) ) %s )" % (j + 1, bindings[j], text)
+        lines.append("(assert %s )" % text)
+    lines.append("(check-sat)")
+    lines.append("(exit)")
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--asserts", type=int, default=100, help="Number of asserts")
+    parser.add_argument("--width", type=int, default=4, help="Bytes per concat chain")
+    parser.add_argument("--depth", type=int, default=2, help="Let nesting depth")
+    parser.add_argument("--arrays", type=int, default=8, help="Number of arrays")
+    parser.add_argument("--sharing", type=float, default=0.0, help="Share of the asserts reusing an earlier read")
+    parser.add_argument("--unused", type=int, default=0, help="Number of unused array declarations")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sys.stdout.write(query(args.asserts, args.width, args.depth, args.arrays, args.sharing, args.unused, args.seed))
+
+if __name__ == "__main__":
+    main()
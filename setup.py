@@ -8,7 +8,7 @@ setup(name='smt2hr',
       author_email='siddharth.muralee@gmail.com',
       license='MIT',
       packages=['smt2hr'],
-      scripts=['bin/smtconv'],
+      scripts=['bin/smtconv', 'bin/smtconv-client'],
       install_requires=[
           'pysmt',
       ],
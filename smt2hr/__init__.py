@@ -1,4 +1,43 @@
-from .simplify import parse as simplifier
+from .options import ENGINES, READERS, FORMATS
 
-def parse(fp, pretty):
-    return simplifier(fp, pretty)
\ No newline at end of file
+'''
+The names below are imported from their module the first time they are used, so
+that importing smt2hr (and running smtconv --help) does not import pysmt.
+'''
+
+LAZY_NAMES = {
+    "simplifier": ("simplify", "parse"),
+    "iter_simplifier": ("simplify", "iter_parse"),
+    "convert_batch": ("batch", "convert_batch"),
+    "AssertCache": ("cache", "AssertCache"),
+    "serve": ("server", "serve"),
+    "Profile": ("profile", "Profile"),
+    "QueryLog": ("querylog", "QueryLog"),
+    "parse_range": ("querylog", "parse_range"),
+    "Renamer": ("rename", "Renamer"),
+    "Session": ("session", "Session"),
+    "Delta": ("session", "Delta"),
+    "iter_records": ("tree", "iter_records"),
+    "write_json": ("tree", "write_json"),
+    "write_msgpack": ("tree", "write_msgpack"),
+}
+
+def __getattr__(name):
+    if name not in LAZY_NAMES:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    from importlib import import_module
+    module, attribute = LAZY_NAMES[name]
+    value = getattr(import_module("." + module, __name__), attribute)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(LAZY_NAMES))
+
+def parse(fp, pretty, engine="tokenizer", jobs=1, cache=None, reader="pysmt", profile=None, renamer=None):
+    from .simplify import parse as simplifier
+    return simplifier(fp, pretty, engine, jobs, cache, reader, profile, renamer)
+
+def iter_parse(fp, pretty, engine="tokenizer", jobs=1, cache=None, reader="pysmt", profile=None, renamer=None, lines=False):
+    from .simplify import iter_parse as iter_simplifier
+    return iter_simplifier(fp, pretty, engine, jobs, cache, reader, profile, renamer, lines)
@@ -0,0 +1,150 @@
+import glob
+import os
+import sys
+import time
+import traceback
+
+from multiprocessing import Pool
+
+from pysmt.environment import reset_env
+
+from .cache import AssertCache, DEFAULT_MAX_SIZE
+from .simplify import iter_parse
+
+'''
+Converts many smt2 files at once. The files are spread over a pool of worker
+processes, so python startup and the pysmt import are only paid once per worker
+instead of once per file.
+'''
+
+def expand_paths(paths, suffix=".smt2"):
+    """
+        Expand directories (every file ending with suffix, recursively) and glob
+        patterns into a list of (filename, relative path) tuples. The relative path
+        is where the output goes in the mirrored output directory.
+    :param paths: Files, directories or glob patterns.
+    :return: List of (filename, relative path).
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                for name in sorted(names):
+                    if name.endswith(suffix):
+                        filename = os.path.join(root, name)
+                        files.append((filename, os.path.relpath(filename, path)))
+        elif os.path.isfile(path):
+            files.append((path, os.path.basename(path)))
+        else:
+            matches = sorted(m for m in glob.glob(path, recursive=True) if os.path.isfile(m))
+            if not matches:
+                raise ValueError("No files match: " + path)
+            base = os.path.commonpath([os.path.dirname(os.path.abspath(m)) for m in matches])
+            for match in matches:
+                files.append((match, os.path.relpath(os.path.abspath(match), base)))
+    return files
+
+def unique_outputs(files):
+    """
+        Drops the files listed more than once, and fails if two different files
+        would be converted to the same relative path, e.g. x/q.smt2 and y/q.smt2:
+        their workers would write the same output at the same time.
+    :param files: List of (filename, relative path), as returned by expand_paths.
+    :return: The list without duplicates.
+    """
+    inputs = {}
+    unique = []
+    for filename, relpath in files:
+        key = os.path.normcase(os.path.normpath(relpath))
+        real = os.path.realpath(filename)
+        if key in inputs:
+            if inputs[key] != real:
+                raise ValueError("%s and %s would both be converted to %s" % (inputs[key], real, relpath))
+            continue
+        inputs[key] = real
+        unique.append((filename, relpath))
+    return unique
+
+def convert_file(filename, output, pretty=False, engine="tokenizer", cache=None, reader="pysmt", renamer=None):
+    """
+        Convert one file, writing every assert as soon as it is rendered.
+    :return: Number of bytes read.
+    """
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename, "r") as fp, open(output, "w") as out:
+        for i, rendered in enumerate(iter_parse(fp, pretty, engine, cache=cache, reader=reader, renamer=renamer)):
+            if i > 0:
+                out.write("\n\n")
+            out.write(rendered)
+    return os.path.getsize(filename)
+
+# The cache of a worker process, opened once by init_worker
+worker_cache = None
+
+def init_worker(cache_path, cache_size):
+    global worker_cache
+    if cache_path is not None:
+        worker_cache = AssertCache(cache_path, cache_size)
+
+def convert_task(task):
+    filename, output, pretty, engine, reader, renamer = task
+    # every file gets a fresh formula manager, so a worker does not keep the
+    # formulas of all the files it has converted
+    reset_env()
+    before = worker_cache.stats() if worker_cache is not None else {}
+    try:
+        size = convert_file(filename, output, pretty, engine, worker_cache, reader, renamer)
+        error = None
+    except Exception:
+        # do not leave a partial output behind
+        if os.path.exists(output):
+            os.remove(output)
+        size = 0
+        error = traceback.format_exc(limit=1)
+    after = worker_cache.stats() if worker_cache is not None else {}
+    return filename, size, error, {name: after[name] - before[name] for name in after}
+
+def convert_batch(paths, outdir, jobs=None, pretty=False, engine="tokenizer", out=sys.stderr,
+                  cache_path=None, cache_size=DEFAULT_MAX_SIZE, stats=False, reader="pysmt", renamer=None):
+    """
+        Convert every file in paths into outdir, mirroring the input directory tree.
+        Failing files are reported on out and do not stop the run.
+    :param paths: Files, directories or glob patterns.
+    :param jobs: Number of worker processes, defaults to the number of cpus.
+    :param cache_path: AssertCache shared by all the workers.
+    :param stats: Also report the cache hits and misses.
+    :param renamer: Renamer of the symbols of every file.
+    :return: Tuple of (converted, failed) filenames.
+    """
+    files = expand_paths(paths)
+    tasks = [(filename, os.path.join(outdir, relpath), pretty, engine, reader, renamer)
+             for filename, relpath in unique_outputs(files)]
+    jobs = jobs or os.cpu_count() or 1
+
+    converted = []
+    failed = []
+    nbytes = 0
+    cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+    start = time.perf_counter()
+    with Pool(min(jobs, max(len(tasks), 1)), init_worker, (cache_path, cache_size)) as pool:
+        for filename, size, error, task_stats in pool.imap_unordered(convert_task, tasks):
+            for name in task_stats:
+                cache_stats[name] += task_stats[name]
+            if error is not None:
+                failed.append(filename)
+                out.write("FAILED %s: %s\n" % (filename, error.strip().splitlines()[-1]))
+            else:
+                converted.append(filename)
+                nbytes += size
+    elapsed = time.perf_counter() - start
+
+    out.write("Converted %d files (%d failed) in %.2fs: %.1f files/s, %.2f MB/s\n" % (
+        len(converted), len(failed), elapsed,
+        len(converted) / elapsed if elapsed else 0,
+        nbytes / elapsed / 1e6 if elapsed else 0))
+    if stats and cache_path is not None:
+        out.write("Cache: %(hits)d hits, %(misses)d misses, %(evictions)d evictions\n" % cache_stats)
+    return converted, failed
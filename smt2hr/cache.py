@@ -0,0 +1,102 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+'''
+On disk cache of rendered asserts. Successive solver queries share most of their
+asserts, so the rendered text is stored under a hash of the serialized assert and
+the rendering options, and looked up before running the Tokenizer pipeline.
+
+The cache is a sqlite database, which takes care of several smtconv processes using
+it at the same time. The least recently used asserts are evicted once the rendered
+text stored goes over max_size bytes.
+'''
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+class AssertCache():
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("BEGIN IMMEDIATE")
+        self.db.execute("CREATE TABLE IF NOT EXISTS asserts (key TEXT PRIMARY KEY, value TEXT, size INTEGER, atime REAL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS asserts_atime ON asserts (atime)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+        self.db.execute("INSERT OR IGNORE INTO meta VALUES ('size', 0)")
+        self.db.execute("COMMIT")
+
+    @staticmethod
+    def key(string, *options):
+        """
+            Key of a serialized assert rendered with the given options.
+        """
+        digest = hashlib.sha256()
+        digest.update(repr(options).encode())
+        digest.update(b"\0")
+        digest.update(string.encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+            Returns the rendered assert stored under key, or None.
+        """
+        row = self.db.execute("SELECT value FROM asserts WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.db.execute("UPDATE asserts SET atime = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key, value):
+        size = len(key) + len(value)
+        if size > self.max_size:
+            return
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            old = self.db.execute("SELECT size FROM asserts WHERE key = ?", (key,)).fetchone()
+            self.db.execute("INSERT OR REPLACE INTO asserts VALUES (?, ?, ?, ?)", (key, value, size, time.time()))
+            self.db.execute("UPDATE meta SET value = value + ? WHERE name = 'size'", (size - (old[0] if old else 0),))
+            self.evict()
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def evict(self):
+        """
+            Drop the least recently used asserts until the cache fits in max_size,
+            this runs inside the transaction of put.
+        """
+        total = self.db.execute("SELECT value FROM meta WHERE name = 'size'").fetchone()[0]
+        if total <= self.max_size:
+            return
+        freed = 0
+        keys = []
+        for key, size in self.db.execute("SELECT key, size FROM asserts ORDER BY atime"):
+            if total - freed <= self.max_size:
+                break
+            keys.append((key,))
+            freed += size
+        self.db.executemany("DELETE FROM asserts WHERE key = ?", keys)
+        self.db.execute("UPDATE meta SET value = value - ? WHERE name = 'size'", (freed,))
+        self.evictions += len(keys)
+
+    def size(self):
+        return self.db.execute("SELECT value FROM meta WHERE name = 'size'").fetchone()[0]
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def close(self):
+        self.db.close()
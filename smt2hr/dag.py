@@ -0,0 +1,347 @@
+import pysmt.operators as op
+from pysmt.utils import quote
+
+from .simplify import Tokenizer, TokenPrinter, collapse_array_pieces, collapse_chain
+
+'''
+The Tokenizer works on the output of serialize(), which inlines every shared
+subterm of the formula. On KLEE queries a single ?B1 concat chain can be referenced
+dozens of times, so the string (and the work done on it) blows up.
+
+The DagSimplifier walks the pysmt formula instead, and builds the simplified tokens
+of every node exactly once, reusing them for every parent that references the node.
+The tokens are the same ones the Tokenizer produces from the serialized string.
+'''
+
+BITWIDTHS = ["1", "8", "16", "32", "64", "128", "256"]
+
+NARY_OPERATORS = {
+    op.AND: "&", op.OR: "|", op.PLUS: "+", op.TIMES: "*", op.DIV: "/",
+    op.POW: "^", op.IFF: "<->", op.IMPLIES: "->", op.MINUS: "-",
+    op.EQUALS: "=", op.LE: "<=", op.LT: "<", op.BV_XOR: "xor",
+    op.BV_UDIV: "u/", op.BV_UREM: "u%", op.BV_SDIV: "s/", op.BV_SREM: "s%",
+    op.BV_SLE: "s<=", op.BV_SLT: "s<", op.BV_ULE: "u<=", op.BV_ULT: "u<",
+    op.BV_LSHL: "<<", op.BV_LSHR: ">>", op.BV_ASHR: "a>>",
+    op.BV_COMP: "bvcomp", op.BV_AND: "&", op.BV_OR: "|", op.BV_ADD: "+",
+    op.BV_MUL: "*", op.BV_SUB: "-",
+}
+
+UNARY_OPERATORS = {op.NOT: "!", op.BV_NOT: "!", op.BV_NEG: "-"}
+
+EXTEND_OPERATORS = {op.BV_ZEXT: "ZEXT", op.BV_SEXT: "SEXT"}
+
+ROTATE_OPERATORS = {op.BV_ROL: "ROL", op.BV_ROR: "ROR"}
+
+class Fragment():
+    '''
+    The simplified tokens of one node. closed is set when the serialized form of
+    the node ends with a ')', in which case the Tokenizer keeps the space in front
+    of the following operator (e.g. ' u%').
+    '''
+
+    __slots__ = ["tokens", "closed"]
+
+    def __init__(self, tokens, closed):
+        self.tokens = tokens
+        self.closed = closed
+
+    def single_token(self):
+        '''
+        Returns the token if the fragment is a single token, possibly wrapped in parens.
+        '''
+        if len(self.tokens) == 1:
+            return self.tokens[0]
+        if len(self.tokens) == 3 and self.tokens[0] == "(" and self.tokens[2] == ")":
+            return self.tokens[1]
+        return None
+
+def glue(*parts):
+    '''
+    Concatenate token tuples the way they would be lexed from the serialized string,
+    i.e. two neighbouring tokens that are not parens become a single token.
+    '''
+    tokens = []
+    for part in parts:
+        if not part:
+            continue
+        if tokens and tokens[-1] not in "()" and part[0] not in "()":
+            tokens[-1] = tokens[-1] + part[0]
+            tokens.extend(part[1:])
+        else:
+            tokens.extend(part)
+    return tuple(tokens)
+
+class DagSimplifier():
+
+    def __init__(self):
+        self.memo = {}
+
+    def simplify(self, formula):
+        return TokenPrinter(remove_uneeded_parens(self.walk(formula).tokens))
+
+    def walk(self, formula):
+        '''
+        Post-order walk over the formula DAG, every node is only rendered once.
+        '''
+        stack = [formula]
+        while stack:
+            node = stack[-1]
+            if node.node_id() in self.memo:
+                stack.pop()
+                continue
+            pending = [arg for arg in node.args() if arg.node_id() not in self.memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            self.memo[node.node_id()] = self.render(node)
+        return self.memo[formula.node_id()]
+
+    def render(self, node):
+        node_type = node.node_type()
+        args = [self.memo[arg.node_id()] for arg in node.args()]
+        if node_type == op.SYMBOL:
+            return Fragment((quote(node.symbol_name(), style="'"),), False)
+        elif node_type == op.BV_CONSTANT:
+            return Fragment((self.bv_constant(node),), False)
+        elif node_type == op.BOOL_CONSTANT:
+            return Fragment(("True" if node.constant_value() else "False",), False)
+        elif node_type == op.INT_CONSTANT:
+            return Fragment((str(node.constant_value()),), False)
+        elif node_type == op.BV_CONCAT:
+            return self.concat(node, args)
+        elif node_type in NARY_OPERATORS:
+            return self.nary(args, NARY_OPERATORS[node_type])
+        elif node_type == op.ARRAY_SELECT:
+            return Fragment(glue(args[0].tokens, ("[",), args[1].tokens, ("]",)), False)
+        elif node_type == op.BV_EXTRACT:
+            extract = "[%d:%d]" % (node.bv_extract_start(), node.bv_extract_end())
+            return Fragment(glue(self.glued_tokens(node.arg(0), args[0]), (extract,)), False)
+        elif node_type in UNARY_OPERATORS:
+            return Fragment(("(", UNARY_OPERATORS[node_type]) + args[0].tokens + (")",), True)
+        elif node_type in EXTEND_OPERATORS:
+            step = str(node.bv_extend_step())
+            return Fragment(("(",) + args[0].tokens + (self.separator(args[0], EXTEND_OPERATORS[node_type]), step, ")"), True)
+        elif node_type in ROTATE_OPERATORS:
+            step = str(node.bv_rotation_step())
+            return Fragment(("(",) + args[0].tokens + (self.separator(args[0], ROTATE_OPERATORS[node_type]), step, ")"), True)
+        elif node_type == op.ITE:
+            return Fragment(("(",) + args[0].tokens + (self.separator(args[0], "?"),) + args[1].tokens
+                            + (self.separator(args[1], ":"),) + args[2].tokens + (")",), True)
+        elif node_type == op.ARRAY_STORE:
+            # a[i := v], a constant keeps its bit width like in the serialized string
+            array = glue(args[0].tokens, ("[",), self.glued_tokens(node.arg(1), args[1]))
+            value = glue(self.glued_tokens(node.arg(2), args[2]), ("]",))
+            return Fragment(array + (self.separator(args[1], ":="),) + value, False)
+        else:
+            # Anything we do not know about goes through the Tokenizer
+            return self.tokenized(node.serialize())
+
+    def tokenized(self, string):
+        '''
+        The Tokenizer drops a token at the very end of its input, so string is lexed
+        in parens which are removed again.
+        '''
+        tokens = list(Tokenizer("(" + string + ")").tokens)
+        if tokens[0] == "(" and matching_paren(tokens, 0) == len(tokens) - 1:
+            tokens = tokens[1:-1]
+        return Fragment(tuple(tokens), string.endswith(")"))
+
+    def bv_constant(self, node):
+        width = str(node.bv_width())
+        if width in BITWIDTHS:
+            return str(node.constant_value())
+        return "%d_%s" % (node.constant_value(), width)
+
+    def glued_tokens(self, node, fragment):
+        '''
+        The bit width of a constant is only removed when it stands on its own (10_32)
+        or is an index ([10_32]), so a constant glued to an extract or a '::' keeps it.
+        '''
+        if node.node_type() == op.BV_CONSTANT:
+            return ("%d_%d" % (node.constant_value(), node.bv_width()),)
+        return fragment.tokens
+
+    def separator(self, fragment, operator):
+        if fragment.closed:
+            return " " + operator
+        return operator
+
+    def nary(self, args, operator):
+        tokens = ("(",) + args[0].tokens
+        for i in range(1, len(args)):
+            tokens += (self.separator(args[i - 1], operator),) + args[i].tokens
+        return Fragment(tokens + (")",), True)
+
+    def concat(self, node, args):
+        '''
+        Concat chains of reads from the same array collapse into a single range,
+        foo_arg_1[3]::foo_arg_1[2:0] becomes foo_arg_1[3:0]
+        '''
+        pieces = [arg.single_token() for arg in args]
+        if None not in pieces:
+            collapsed = collapse_array_pieces(pieces)
+            if collapsed is not None:
+                return Fragment(("(", collapsed, ")"), True)
+        parts = [("(",)]
+        for i, arg in enumerate(args):
+            if i > 0:
+                parts.append(("::",))
+            parts.append(self.glued_tokens(node.arg(i), arg))
+        parts.append((")",))
+        return Fragment(merge_chains(glue(*parts)), True)
+
+def dag_string(formula):
+    '''
+    A serialization of formula that is linear in the size of its DAG, for the cache
+    keys of the engines that work on the DAG: one line per node in post order, its
+    type, payload and the lines of its arguments. serialize() inlines the shared
+    subterms like the Tokenizer input does.
+    '''
+    lines = {}
+    parts = []
+    stack = [formula]
+    while stack:
+        node = stack[-1]
+        if node.node_id() in lines:
+            stack.pop()
+            continue
+        pending = [arg for arg in node.args() if arg.node_id() not in lines]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        node_type = node.node_type()
+        if node_type == op.SYMBOL:
+            payload = repr(node.symbol_name())
+        elif node_type == op.BV_CONSTANT:
+            payload = "%d_%d" % (node.constant_value(), node.bv_width())
+        elif node_type == op.BOOL_CONSTANT or node_type == op.INT_CONSTANT:
+            payload = str(node.constant_value())
+        elif node_type == op.BV_EXTRACT:
+            payload = "%d:%d" % (node.bv_extract_end(), node.bv_extract_start())
+        elif node_type in EXTEND_OPERATORS:
+            payload = str(node.bv_extend_step())
+        elif node_type in ROTATE_OPERATORS:
+            payload = str(node.bv_rotation_step())
+        else:
+            payload = ""
+        lines[node.node_id()] = len(parts)
+        parts.append("%d %s %s" % (node_type, payload, " ".join(str(lines[arg.node_id()]) for arg in node.args())))
+    return "\n".join(parts)
+
+def matching_paren(tokens, start):
+    '''
+    Returns the index of the ')' closing the '(' at tokens[start], or -1.
+    '''
+    depth = 0
+    for i in range(start, len(tokens)):
+        if tokens[i] == "(":
+            depth += 1
+        elif tokens[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    return -1
+
+def merge_chains(tokens):
+    '''
+    Same as Tokenizer.concatnating_arrays on the tokens of a concat chain, a piece in
+    parens is merged into the piece before it: ['a[x]::' '(' 'a[1]::350_48' ')']
+    becomes ['a[x]::a[1]::350_48'], which is collapsed into a range if it can be.
+    '''
+    ret = []
+    for token in tokens:
+        if token == ")" and len(ret) > 2 and ret[-2] == "(" and ret[-1] not in "()" \
+                and ret[-3] not in "()" and ret[-3].endswith("::"):
+            inner = ret.pop()
+            ret.pop()
+            ret[-1] = collapse_chain(ret[-1] + inner)
+        else:
+            ret.append(token)
+    return tuple(ret)
+
+def remove_uneeded_parens(tokens):
+    '''
+    Same as Tokenizer.remove_uneeded_parens, ['(' 'foo_arg_1[3:0]' ')'] becomes
+    ['foo_arg_1[3:0]'], but without deleting from the middle of the list.
+    '''
+    ret = []
+    i = 0
+    while i < len(tokens):
+        if tokens[i] == "(" and i + 2 < len(tokens) and tokens[i+2] == ")":
+            ret.append(tokens[i+1])
+            i += 3
+        else:
+            ret.append(tokens[i])
+            i += 1
+    return ret
+
+class SharedSimplifier(DagSimplifier):
+    '''
+    Prints every subterm that is referenced more than once a single time, as a
+    temporary, and refers to it by name afterwards:
+
+        t1 = (foo_arg_0[3:0] u% 129)
+        (5 = t1) & (t1 s< foo_arg_2[3:0])
+
+    pysmt hash-conses the formulas, so a repeated subterm is the same node. The
+    references are counted over all the asserts of a file first (count), then each
+    temporary is defined right before the first assert that uses it. The output is
+    linear in the size of the DAG instead of the size of the inlined formula.
+
+    Subterms that render to a single token (symbols, constants, array reads and
+    collapsed concat chains like foo_arg_1[3:0]) are not worth a name and are
+    always inlined, which also keeps chains of reads collapsing into one range.
+    '''
+
+    def __init__(self, prefix="t"):
+        super().__init__()
+        self.prefix = prefix
+        # node id -> number of parents referencing it
+        self.references = {}
+        self.temporaries = 0
+        # definitions of temporaries added by the assert being simplified
+        self.definitions = []
+
+    def count(self, formulas):
+        '''
+        Counts the references to every node of formulas, and picks a prefix for the
+        temporaries that no symbol of the formulas starts with.
+        '''
+        seen = set()
+        names = set()
+        stack = list(formulas)
+        for formula in formulas:
+            seen.add(formula.node_id())
+        while stack:
+            node = stack.pop()
+            if node.node_type() == op.SYMBOL:
+                names.add(node.symbol_name())
+            for arg in node.args():
+                self.references[arg.node_id()] = self.references.get(arg.node_id(), 0) + 1
+                if arg.node_id() not in seen:
+                    seen.add(arg.node_id())
+                    stack.append(arg)
+        while any(name.startswith(self.prefix) and name[len(self.prefix):].isdigit() for name in names):
+            self.prefix += "_"
+
+    def simplify(self, formula):
+        '''
+        Returns the definitions of the temporaries first used by formula, as
+        rendered lines, and the TokenPrinter of formula.
+        '''
+        self.definitions = []
+        tokens = DagSimplifier.simplify(self, formula)
+        return self.definitions, tokens
+
+    def render(self, node):
+        fragment = DagSimplifier.render(self, node)
+        if self.references.get(node.node_id(), 0) < 2 or fragment.single_token() is not None:
+            return fragment
+        self.temporaries += 1
+        name = "%s%d" % (self.prefix, self.temporaries)
+        # strip the space the printer puts before a first token that is not a paren
+        value = TokenPrinter(remove_uneeded_parens(fragment.tokens)).tokens_to_string().lstrip()
+        self.definitions.append(name + " = " + value)
+        return Fragment((name,), False)
@@ -0,0 +1,11 @@
+'''
+The choices of the conversion options. They are kept apart from the modules that
+use them, which import pysmt, so that the command line can be set up (and --help
+printed) without importing it.
+'''
+
+ENGINES = ["tokenizer", "dag", "shared", "smt2inf"]
+
+READERS = ["pysmt", "native"]
+
+FORMATS = ["text", "json", "msgpack"]
@@ -0,0 +1,94 @@
+import json
+import time
+
+'''
+Per stage instrumentation of a conversion. A Profile is passed down to iter_parse,
+Tokenizer and smt2inf, which add the wall time and the number of tokens of every
+stage they run, and the totals of every assert. Without a Profile (the default)
+the only cost is a check for None per assert.
+'''
+
+class Profile():
+
+    def __init__(self):
+        # stage -> [seconds, calls, tokens]
+        self.stages = {}
+        # stages run inside another stage, their time is already in the outer one
+        self.nested = set()
+        # one dict per assert, in the order of the file
+        self.asserts = []
+
+    def add(self, stage, seconds, tokens=0, nested=False):
+        """
+            Add one run of stage, with the number of tokens it left.
+        :param nested: The stage runs inside another one, it is not counted in the total.
+        """
+        if nested:
+            self.nested.add(stage)
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = [seconds, 1, tokens]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+            entry[2] += tokens
+
+    def timed(self, stage, iterator):
+        """
+            Yields from iterator, adding the time each item takes to stage.
+        """
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - start)
+                return
+            self.add(stage, time.perf_counter() - start)
+            yield item
+
+    def add_assert(self, seconds, chars, tokens):
+        """
+            Add the totals of the next assert, chars is the length of its serialized form.
+        """
+        self.asserts.append({"index": len(self.asserts), "seconds": seconds, "chars": chars, "tokens": tokens})
+
+    def slowest(self, count=10):
+        return sorted(self.asserts, key=lambda entry: entry["seconds"], reverse=True)[:count]
+
+    def total(self):
+        """
+            The time of all the stages, without the nested ones.
+        """
+        return sum(entry[0] for stage, entry in self.stages.items() if stage not in self.nested)
+
+    def to_dict(self, count=10):
+        return {
+            "total_seconds": self.total(),
+            "stages": [{"stage": stage, "seconds": seconds, "calls": calls, "tokens": tokens, "nested": stage in self.nested}
+                       for stage, (seconds, calls, tokens) in self.stages.items()],
+            "asserts": self.asserts,
+            "slowest": self.slowest(count),
+        }
+
+    def write_json(self, path, count=10):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(count), f, indent=1)
+
+    def table(self, count=10):
+        """
+            The stages and the slowest asserts as text tables.
+        """
+        total = self.total() or 1
+        lines = ["%-32s %10s %6s %8s %12s" % ("stage", "time (ms)", "%", "calls", "tokens")]
+        for stage, (seconds, calls, tokens) in self.stages.items():
+            # nested stages are indented, their time is also in the stage they run in
+            name = "  " + stage if stage in self.nested else stage
+            lines.append("%-32s %10.1f %6.1f %8d %12d" % (name, seconds * 1000, seconds * 100 / total, calls, tokens))
+        if self.asserts:
+            lines.append("")
+            lines.append("%-32s %10s %6s %8s %12s" % ("slowest asserts", "time (ms)", "", "chars", "tokens"))
+            for entry in self.slowest(count):
+                lines.append("%-32s %10.1f %6s %8d %12d" % (
+                    "#%d" % entry["index"], entry["seconds"] * 1000, "", entry["chars"], entry["tokens"]))
+        return "\n".join(lines)
@@ -0,0 +1,166 @@
+import io
+import mmap
+import os
+import struct
+
+from array import array
+
+from pysmt.environment import reset_env
+
+from .simplify import iter_parse
+from .tree import iter_records
+
+'''
+Random access to the queries of a solver log, like KLEE's all-queries.smt2, where
+every query is a (set-logic ...) ... (check-sat) block appended to one file of
+several gigabytes.
+
+The log is memory mapped and the offsets of the (set-logic lines are found in a
+single scan, then saved next to it in a sidecar index (<log>.idx). Later runs
+load the index instead of scanning again, it is rebuilt when the size or the
+modification time of the log changed. Converting a query only reads its bytes.
+'''
+
+INDEX_MAGIC = b"SMTQIDX1"
+
+# magic, size and modification time (ns) of the log the offsets are of
+INDEX_HEADER = struct.Struct("<8sQQ")
+
+QUERY_START = b"(set-logic"
+
+def find_queries(data):
+    '''
+    Returns the offsets of the queries in data (bytes or a mmap), a query starts
+    with a (set-logic at the start of a line. A log without any is a single query.
+    '''
+    offsets = array("Q")
+    if data[:len(QUERY_START)] == QUERY_START:
+        offsets.append(0)
+    position = data.find(b"\n" + QUERY_START)
+    while position >= 0:
+        offsets.append(position + 1)
+        position = data.find(b"\n" + QUERY_START, position + 1)
+    if not offsets and len(data):
+        offsets.append(0)
+    return offsets
+
+class QueryLog():
+
+    def __init__(self, filename, index_path=None):
+        self.filename = filename
+        self.index_path = index_path if index_path is not None else filename + ".idx"
+        self.file = open(filename, "rb")
+        stat = os.fstat(self.file.fileno())
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime_ns
+        # an empty file can not be mapped
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.offsets = self.load_index()
+        if self.offsets is None:
+            self.offsets = find_queries(self.data)
+            self.save_index()
+
+    def load_index(self):
+        """
+            Returns the offsets saved in the sidecar index, or None if there is no
+            index or it is not the index of the log as it is now.
+        """
+        try:
+            with open(self.index_path, "rb") as f:
+                header = f.read(INDEX_HEADER.size)
+                if len(header) != INDEX_HEADER.size or INDEX_HEADER.unpack(header) != (INDEX_MAGIC, self.size, self.mtime):
+                    return None
+                offsets = array("Q")
+                offsets.frombytes(f.read())
+        except (OSError, ValueError):
+            return None
+        return offsets
+
+    def save_index(self):
+        """
+            Saves the offsets next to the log, the log is still usable if the index can
+            not be written (e.g. read-only directory).
+        """
+        temporary = self.index_path + ".%d.tmp" % os.getpid()
+        try:
+            with open(temporary, "wb") as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, self.size, self.mtime))
+                f.write(self.offsets.tobytes())
+            os.replace(temporary, self.index_path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def bounds(self, n):
+        """
+            Returns the (start, end) offsets of query n.
+        """
+        if n < 0 or n >= len(self.offsets):
+            raise IndexError("Query %d out of range, the log has %d queries" % (n, len(self.offsets)))
+        end = self.offsets[n + 1] if n + 1 < len(self.offsets) else self.size
+        return self.offsets[n], end
+
+    def query(self, n):
+        """
+            Returns the text of query n, counting from 0.
+        """
+        start, end = self.bounds(n)
+        return self.data[start:end].decode()
+
+    def queries(self, start=0, stop=None):
+        """
+            Yields (n, text) for the queries from start up to stop (excluded).
+        """
+        if stop is None or stop > len(self.offsets):
+            stop = len(self.offsets)
+        for n in range(start, stop):
+            yield n, self.query(n)
+
+    def iter_parse(self, start=0, stop=None, pretty=False, engine="tokenizer", jobs=1, cache=None, reader="pysmt", profile=None, renamer=None, lines=False):
+        """
+            Yields (n, rendered asserts) for the queries from start up to stop, the
+            rendered asserts are an iterator like the one of simplify.iter_parse. Every
+            query gets a fresh formula manager.
+        """
+        for n, text in self.queries(start, stop):
+            reset_env()
+            yield n, iter_parse(io.StringIO(text), pretty, engine, jobs, cache, reader, profile, renamer, lines)
+
+    def iter_records(self, start=0, stop=None, reader="pysmt", renamer=None):
+        """
+            Yields the tree records (see tree.iter_records) of the asserts of the queries
+            from start up to stop, with the number of their query under "query".
+        """
+        for n, text in self.queries(start, stop):
+            reset_env()
+            for record in iter_records(io.StringIO(text), reader, renamer):
+                record["query"] = n
+                yield record
+
+    def close(self):
+        if self.size:
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def parse_range(value):
+    """
+        Parses a range of queries A:B (B excluded), A or B can be left out.
+    :return: Tuple of (start, stop), stop is None up to the last query.
+    """
+    if ":" not in value:
+        raise ValueError("Expected A:B, got " + value)
+    start, stop = value.split(":", 1)
+    start = int(start) if start else 0
+    stop = int(stop) if stop else None
+    if start < 0 or (stop is not None and stop < start):
+        raise ValueError("Invalid range " + value)
+    return start, stop
@@ -0,0 +1,541 @@
+import re
+import pysmt.operators as op
+from pysmt.utils import quote
+
+'''
+A small SMT-LIB reader for the files KLEE and MAGMA dump (QF_AUFBV: array and bit
+vector declare-funs, let, concat/select and bit vector arithmetic). pysmt type checks
+every term and builds a full formula environment, while we only need the asserts as
+trees, so this reads the s-expressions straight into Nodes.
+
+Nodes have the part of the pysmt FNode interface the simplifiers use, and are built
+the way pysmt's parser builds its formulas (e.g. (bvugt a b) becomes b u< a), so
+that both readers give the same output. Anything outside of this subset raises
+Unsupported, and the caller falls back to pysmt.
+'''
+
+class Unsupported(Exception):
+    pass
+
+BOOL = ("Bool",)
+
+class Node():
+
+    __slots__ = ["kind", "children", "payload", "sort", "id"]
+
+    def __init__(self, kind, children, payload, sort, id):
+        self.kind = kind
+        self.children = children
+        self.payload = payload
+        self.sort = sort
+        self.id = id
+
+    def node_id(self):
+        return self.id
+
+    def node_type(self):
+        return self.kind
+
+    def args(self):
+        return self.children
+
+    def arg(self, i):
+        return self.children[i]
+
+    def symbol_name(self):
+        return self.payload
+
+    def constant_value(self):
+        return self.payload
+
+    def bv_width(self):
+        return self.sort[1]
+
+    def bv_extract_start(self):
+        return self.payload[0]
+
+    def bv_extract_end(self):
+        return self.payload[1]
+
+    def bv_extend_step(self):
+        return self.payload
+
+    def bv_rotation_step(self):
+        return self.payload
+
+    def serialize(self):
+        return serialize(self)
+
+# s-expression tokens: parens, |quoted symbols|, "strings", comments and atoms
+SEXPR_TOKEN = re.compile(r'\s+|;[^\n]*|(\()|(\))|\|([^|]*)\||("(?:[^"]|"")*")|([^\s()|";]+)')
+
+# Operators that map to one node type: name -> (node type, result sort, swap args)
+# None as the result sort means the sort of the first argument
+BV_OPERATORS = {
+    "bvand": (op.BV_AND, None, False), "bvor": (op.BV_OR, None, False),
+    "bvxor": (op.BV_XOR, None, False), "bvadd": (op.BV_ADD, None, False),
+    "bvsub": (op.BV_SUB, None, False), "bvmul": (op.BV_MUL, None, False),
+    "bvudiv": (op.BV_UDIV, None, False), "bvurem": (op.BV_UREM, None, False),
+    "bvsdiv": (op.BV_SDIV, None, False), "bvsrem": (op.BV_SREM, None, False),
+    "bvshl": (op.BV_LSHL, None, False), "bvlshr": (op.BV_LSHR, None, False),
+    "bvashr": (op.BV_ASHR, None, False),
+    "bvult": (op.BV_ULT, BOOL, False), "bvule": (op.BV_ULE, BOOL, False),
+    "bvugt": (op.BV_ULT, BOOL, True), "bvuge": (op.BV_ULE, BOOL, True),
+    "bvslt": (op.BV_SLT, BOOL, False), "bvsle": (op.BV_SLE, BOOL, False),
+    "bvsgt": (op.BV_SLT, BOOL, True), "bvsge": (op.BV_SLE, BOOL, True),
+    "bvcomp": (op.BV_COMP, ("BV", 1), False), "=>": (op.IMPLIES, BOOL, False),
+}
+
+IGNORED_COMMANDS = ["set-logic", "set-info", "set-option", "check-sat", "exit",
+                    "get-model", "get-value", "get-info", "push", "pop"]
+
+class NativeReader():
+
+    def __init__(self):
+        self.nodes = {}
+        self.symbols = {}
+        # name -> sort of the declared symbols, their nodes are made when first used
+        self.declarations = {}
+        # the files declare thousands of symbols with a few sorts
+        self.sorts = {}
+        # name -> stack of let bound values
+        self.scope = {}
+
+    def node(self, kind, children, payload, sort):
+        '''
+        Nodes are hash consed like pysmt formulas, so equal subterms are shared.
+        '''
+        key = (kind, tuple(child.id for child in children), payload, sort)
+        node = self.nodes.get(key)
+        if node is None:
+            node = Node(kind, tuple(children), payload, sort, len(self.nodes))
+            self.nodes[key] = node
+        return node
+
+    def read(self, text):
+        '''
+        Returns the list of the asserts in text.
+        '''
+        asserts = []
+        stack = [[]]
+        for match in SEXPR_TOKEN.finditer(text):
+            opening, closing, quoted, string, atom = match.groups()
+            if opening:
+                stack.append([])
+            elif closing:
+                if len(stack) == 1:
+                    raise Unsupported("Unbalanced ')'")
+                sexpr = stack.pop()
+                if len(stack) == 1:
+                    self.command(sexpr, asserts)
+                else:
+                    stack[-1].append(sexpr)
+            elif quoted is not None:
+                stack[-1].append(quoted)
+            elif string is not None or atom is not None:
+                stack[-1].append(string or atom)
+        if len(stack) != 1 or stack[0]:
+            raise Unsupported("Unexpected end of file")
+        return asserts
+
+    def command(self, sexpr, asserts):
+        if not sexpr or not isinstance(sexpr[0], str):
+            raise Unsupported("Bad command")
+        name = sexpr[0]
+        if name == "assert" and len(sexpr) == 2:
+            asserts.append(self.term(sexpr[1]))
+        elif name == "declare-fun" and len(sexpr) == 4 and sexpr[2] == []:
+            self.declare(sexpr[1], sexpr[3])
+        elif name == "declare-const" and len(sexpr) == 3:
+            self.declare(sexpr[1], sexpr[2])
+        elif name not in IGNORED_COMMANDS:
+            raise Unsupported("Command " + name)
+
+    def declare(self, name, sort):
+        sort = self.parse_sort(sort)
+        self.symbols.pop(name, None)
+        self.declarations[name] = self.sorts.setdefault(sort, sort)
+
+    def symbol(self, name):
+        '''
+        Makes the node of a declared symbol on its first use, most of the arrays
+        declared in the files are never read.
+        '''
+        node = self.symbols.get(name)
+        if node is None:
+            node = self.node(op.SYMBOL, (), name, self.declarations[name])
+            self.symbols[name] = node
+        return node
+
+    def parse_sort(self, sexpr):
+        if sexpr == "Bool":
+            return BOOL
+        if isinstance(sexpr, list) and len(sexpr) == 3 and sexpr[:2] == ["_", "BitVec"]:
+            return ("BV", int(sexpr[2]))
+        if isinstance(sexpr, list) and len(sexpr) == 3 and sexpr[0] == "Array":
+            return ("Array", self.parse_sort(sexpr[1]), self.parse_sort(sexpr[2]))
+        raise Unsupported("Sort " + str(sexpr))
+
+    def term(self, sexpr):
+        '''
+        Builds the node of a term with an explicit stack, so deep let chains do not
+        hit the recursion limit. Let bindings are visible in the bindings after them,
+        like in pysmt.
+        '''
+        values = []
+        todo = [("term", sexpr)]
+        while todo:
+            action, arg = todo.pop()
+            if action == "term":
+                if isinstance(arg, str):
+                    values.append(self.atom(arg))
+                elif not arg:
+                    raise Unsupported("Empty term")
+                elif arg[0] == "let" and len(arg) == 3 and isinstance(arg[1], list):
+                    names = []
+                    todo.append(("unbind", names))
+                    todo.append(("term", arg[2]))
+                    for binding in reversed(arg[1]):
+                        if not isinstance(binding, list) or len(binding) != 2 or not isinstance(binding[0], str):
+                            raise Unsupported("Bad let binding")
+                        names.append(binding[0])
+                        todo.append(("bind", binding[0]))
+                        todo.append(("term", binding[1]))
+                elif arg[0] == "_":
+                    values.append(self.indexed_constant(arg))
+                else:
+                    todo.append(("apply", (arg[0], len(arg) - 1)))
+                    for child in reversed(arg[1:]):
+                        todo.append(("term", child))
+            elif action == "apply":
+                function, nargs = arg
+                args = values[len(values) - nargs:]
+                del values[len(values) - nargs:]
+                values.append(self.apply(function, args))
+            elif action == "bind":
+                self.scope.setdefault(arg, []).append(values.pop())
+            else:
+                for name in arg:
+                    self.scope[name].pop()
+        return values[0]
+
+    def atom(self, token):
+        if token in self.scope and self.scope[token]:
+            return self.scope[token][-1]
+        if token in self.declarations:
+            return self.symbol(token)
+        if token.startswith("#b"):
+            return self.node(op.BV_CONSTANT, (), int("0" + token[2:], 2), ("BV", len(token) - 2))
+        if token.startswith("#x"):
+            return self.node(op.BV_CONSTANT, (), int("0" + token[2:], 16), ("BV", (len(token) - 2) * 4))
+        if token == "true" or token == "false":
+            return self.node(op.BOOL_CONSTANT, (), token == "true", BOOL)
+        raise Unsupported("Atom " + token)
+
+    def indexed_constant(self, sexpr):
+        if len(sexpr) == 3 and sexpr[1].startswith("bv") and sexpr[1][2:].isdigit() and sexpr[2].isdigit():
+            width = int(sexpr[2])
+            return self.node(op.BV_CONSTANT, (), int(sexpr[1][2:]) % (2 ** width), ("BV", width))
+        raise Unsupported("Indexed term " + str(sexpr))
+
+    def apply(self, function, args):
+        if isinstance(function, list):
+            return self.apply_indexed(function, args)
+        if function in BV_OPERATORS and len(args) == 2:
+            kind, sort, swap = BV_OPERATORS[function]
+            if swap:
+                args = [args[1], args[0]]
+            return self.node(kind, args, None, sort or args[0].sort)
+        if function == "and" or function == "or":
+            if len(args) == 1:
+                return args[0]
+            if not args:
+                return self.node(op.BOOL_CONSTANT, (), function == "and", BOOL)
+            return self.node(op.AND if function == "and" else op.OR, args, None, BOOL)
+        if function == "not" and len(args) == 1:
+            return self.negate(args[0])
+        if function == "=" and len(args) == 2:
+            return self.node(op.IFF if args[0].sort == BOOL else op.EQUALS, args, None, BOOL)
+        if function == "xor" and len(args) == 2:
+            return self.negate(self.node(op.IFF, args, None, BOOL))
+        if function == "ite" and len(args) == 3:
+            return self.node(op.ITE, args, None, args[1].sort)
+        if function == "concat" and len(args) >= 2:
+            node = args[0]
+            for arg in args[1:]:
+                node = self.node(op.BV_CONCAT, (node, arg), None, ("BV", node.sort[1] + arg.sort[1]))
+            return node
+        if function == "bvnot" and len(args) == 1:
+            return self.node(op.BV_NOT, args, None, args[0].sort)
+        if function == "bvneg" and len(args) == 1:
+            return self.node(op.BV_NEG, args, None, args[0].sort)
+        if function == "select" and len(args) == 2 and args[0].sort[0] == "Array":
+            return self.node(op.ARRAY_SELECT, args, None, args[0].sort[2])
+        if function == "store" and len(args) == 3 and args[0].sort[0] == "Array":
+            return self.node(op.ARRAY_STORE, args, None, args[0].sort)
+        raise Unsupported("Function " + str(function))
+
+    def apply_indexed(self, function, args):
+        if len(function) < 3 or function[0] != "_" or len(args) != 1 or args[0].sort[0] != "BV" or \
+                not all(isinstance(index, str) and index.isdigit() for index in function[2:]):
+            raise Unsupported("Indexed function " + str(function))
+        name = function[1]
+        indexes = [int(index) for index in function[2:]]
+        width = args[0].sort[1]
+        if name == "extract" and len(indexes) == 2:
+            end, start = indexes
+            return self.node(op.BV_EXTRACT, args, (start, end), ("BV", end - start + 1))
+        if name == "zero_extend" and len(indexes) == 1:
+            return self.node(op.BV_ZEXT, args, indexes[0], ("BV", width + indexes[0]))
+        if name == "sign_extend" and len(indexes) == 1:
+            return self.node(op.BV_SEXT, args, indexes[0], ("BV", width + indexes[0]))
+        if name == "rotate_left" and len(indexes) == 1:
+            return self.node(op.BV_ROL, args, indexes[0], args[0].sort)
+        if name == "rotate_right" and len(indexes) == 1:
+            return self.node(op.BV_ROR, args, indexes[0], args[0].sort)
+        raise Unsupported("Indexed function " + str(function))
+
+    def negate(self, node):
+        if node.kind == op.NOT:
+            return node.children[0]
+        return self.node(op.NOT, (node,), None, BOOL)
+
+def read_asserts(text):
+    '''
+    Returns the asserts of the SMT-LIB text as Nodes, raises Unsupported if the
+    text is not in the subset we read.
+    '''
+    try:
+        return NativeReader().read(text)
+    except (Unsupported, IndexError, KeyError, TypeError, ValueError) as e:
+        if isinstance(e, Unsupported):
+            raise
+        raise Unsupported(repr(e))
+
+SYMBOL = r'\|[^|]*\||[^\s()|;"]+'
+SORT = r'[^\s()|;"]+|\((?:[^()]|\((?:[^()]|\([^()]*\))*\))*\)'
+# declarations of symbols without arguments, the name is in the first or second group
+DECLARATION = re.compile(r'\(\s*declare-(?:fun\s+(%s)\s*\(\s*\)|const\s+(%s))\s*(?:%s)\s*\)' % (SYMBOL, SYMBOL, SORT))
+WORD = re.compile(r'\|([^|]*)\||([^\s()|;"]+)')
+# what the paren depth of a command depends on: parens, and the comments, quoted
+# symbols and strings they can be hidden in
+COMMAND_TOKEN = re.compile(r';[^\n]*|\|[^|]*\||"(?:[^"]|"")*"|([()])')
+COMMAND_NAME = re.compile(r'\(\s*([^\s()|;"]+)')
+
+def split_commands(text):
+    '''
+    Returns the (name, start, end) of every top level command of text, without
+    parsing them.
+    '''
+    commands = []
+    depth = 0
+    start = 0
+    for match in COMMAND_TOKEN.finditer(text):
+        paren = match.group(1)
+        if paren == "(":
+            if depth == 0:
+                start = match.start()
+            depth += 1
+        elif paren == ")":
+            depth -= 1
+            if depth == 0:
+                name = COMMAND_NAME.match(text, start)
+                commands.append((name.group(1) if name else "", start, match.end()))
+            elif depth < 0:
+                raise Unsupported("Unbalanced ')'")
+    if depth != 0:
+        raise Unsupported("Unexpected end of file")
+    return commands
+
+
+def find_declarations(text):
+    '''
+    Returns the (name, start, end) of the declarations of symbols without arguments
+    in text.
+    '''
+    declarations = []
+    for match in DECLARATION.finditer(text):
+        name = match.group(1) or match.group(2)
+        if name.startswith("|"):
+            name = name[1:-1]
+        declarations.append((name, match.start(), match.end()))
+    return declarations
+
+def referenced_words(text, declarations):
+    '''
+    Returns the set of the words of text outside of its declarations.
+    '''
+    referenced = set()
+    last = 0
+    for _, start, end in declarations:
+        referenced.update(quoted or word for quoted, word in WORD.findall(text, last, start))
+        last = end
+    referenced.update(quoted or word for quoted, word in WORD.findall(text, last))
+    return referenced
+
+def drop_declarations(text, declarations, unused):
+    '''
+    Returns text without the declarations of the names in unused.
+    '''
+    ret = []
+    last = 0
+    for name, start, end in declarations:
+        if name in unused:
+            ret.append(text[last:start])
+            last = end
+    if last == 0:
+        return text
+    ret.append(text[last:])
+    return "".join(ret)
+
+def prune_declarations(text):
+    '''
+    Returns text without the declarations of the symbols nothing else in it refers
+    to, so that the parsers only build the symbols the asserts use. The files keep
+    thousands of array declarations for a handful of asserts, this only looks at
+    the rest of the text word by word.
+    '''
+    declarations = find_declarations(text)
+    if not declarations:
+        return text
+    referenced = referenced_words(text, declarations)
+    return drop_declarations(text, declarations, {name for name, _, _ in declarations if name not in referenced})
+
+# Characters of whole lines read at once by open_pruned
+PRUNE_CHUNK = 1024 * 1024
+
+def iter_line_chunks(fp):
+    '''
+    Yields the text of fp in chunks of about PRUNE_CHUNK characters that end at the
+    end of a line, a longer line is a chunk of its own.
+    '''
+    carry = ""
+    while True:
+        data = fp.read(PRUNE_CHUNK)
+        if not data:
+            if carry:
+                yield carry
+            return
+        end = data.rfind("\n") + 1
+        if end == 0:
+            carry += data
+            continue
+        yield carry + data[:end]
+        carry = data[end:]
+
+def open_pruned(fp):
+    '''
+    Like prune_declarations, for a seekable file that is not read into memory: a
+    first pass over chunks of whole lines finds the declarations nothing refers to,
+    then fp is read again without them, a chunk at a time, through a ChunkReader.
+    A declaration split over two chunks is kept. fp itself is returned, at the
+    position it was at, if there is nothing to drop.
+    '''
+    position = fp.tell()
+    declared = set()
+    referenced = set()
+    for chunk in iter_line_chunks(fp):
+        declarations = find_declarations(chunk)
+        declared.update(name for name, _, _ in declarations)
+        referenced.update(referenced_words(chunk, declarations))
+    fp.seek(position)
+    unused = declared - referenced
+    if not unused:
+        return fp
+    return ChunkReader(drop_declarations(chunk, find_declarations(chunk), unused) for chunk in iter_line_chunks(fp))
+
+class ChunkReader():
+    '''
+    Read only file over an iterator of strings, for pysmt's parser, which reads one
+    character at a time.
+    '''
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.chunk = ""
+        self.position = 0
+
+    def read(self, size=-1):
+        position = self.position
+        if size == 1 and position < len(self.chunk):
+            self.position = position + 1
+            return self.chunk[position]
+        if position >= len(self.chunk):
+            self.chunk = next(self.chunks, "")
+            position = 0
+        if size < 0:
+            ret = self.chunk[position:] + "".join(self.chunks)
+        else:
+            ret = self.chunk[position:position + size]
+        self.position = position + len(ret)
+        return ret
+
+    def __iter__(self):
+        # pysmt iterates over the file instead of reading it with python -O
+        if self.position < len(self.chunk):
+            yield self.chunk[self.position:]
+        self.chunk = ""
+        self.position = 0
+        yield from self.chunks
+
+# Serialized forms of the nodes, in the format of pysmt's HRPrinter
+NARY_FORMATS = {
+    op.AND: " & ", op.OR: " | ", op.IFF: " <-> ", op.IMPLIES: " -> ",
+    op.EQUALS: " = ", op.BV_XOR: " xor ", op.BV_CONCAT: "::",
+    op.BV_UDIV: " u/ ", op.BV_UREM: " u% ", op.BV_SDIV: " s/ ", op.BV_SREM: " s% ",
+    op.BV_SLE: " s<= ", op.BV_SLT: " s< ", op.BV_ULE: " u<= ", op.BV_ULT: " u< ",
+    op.BV_LSHL: " << ", op.BV_LSHR: " >> ", op.BV_ASHR: " a>> ",
+    op.BV_COMP: " bvcomp ", op.BV_AND: " & ", op.BV_OR: " | ",
+    op.BV_ADD: " + ", op.BV_MUL: " * ", op.BV_SUB: " - ",
+}
+
+def serialize(node):
+    '''
+    Serializes a node the way pysmt's serialize() does, with an explicit stack.
+    '''
+    ret = []
+    todo = [node]
+    while todo:
+        item = todo.pop()
+        if isinstance(item, str):
+            ret.append(item)
+            continue
+        kind = item.kind
+        args = item.children
+        if kind == op.SYMBOL:
+            ret.append(quote(item.payload, style="'"))
+        elif kind == op.BV_CONSTANT:
+            ret.append("%d_%d" % (item.payload, item.sort[1]))
+        elif kind == op.BOOL_CONSTANT:
+            ret.append("True" if item.payload else "False")
+        elif kind in NARY_FORMATS:
+            parts = ["("]
+            for i, arg in enumerate(args):
+                if i > 0:
+                    parts.append(NARY_FORMATS[kind])
+                parts.append(arg)
+            parts.append(")")
+            todo.extend(reversed(parts))
+        elif kind == op.NOT or kind == op.BV_NOT:
+            todo.extend(reversed(["(! ", args[0], ")"]))
+        elif kind == op.BV_NEG:
+            todo.extend(reversed(["(- ", args[0], ")"]))
+        elif kind == op.BV_EXTRACT:
+            todo.extend(reversed([args[0], "[%d:%d]" % item.payload]))
+        elif kind == op.BV_ZEXT:
+            todo.extend(reversed(["(", args[0], " ZEXT %d)" % item.payload]))
+        elif kind == op.BV_SEXT:
+            todo.extend(reversed(["(", args[0], " SEXT %d)" % item.payload]))
+        elif kind == op.BV_ROL:
+            todo.extend(reversed(["(", args[0], " ROL %d)" % item.payload]))
+        elif kind == op.BV_ROR:
+            todo.extend(reversed(["(", args[0], " ROR %d)" % item.payload]))
+        elif kind == op.ITE:
+            todo.extend(reversed(["(", args[0], " ? ", args[1], " : ", args[2], ")"]))
+        elif kind == op.ARRAY_SELECT:
+            todo.extend(reversed([args[0], "[", args[1], "]"]))
+        elif kind == op.ARRAY_STORE:
+            todo.extend(reversed([args[0], "[", args[1], " := ", args[2], "]"]))
+        else:
+            raise ValueError("Can not serialize node type %d" % kind)
+    return "".join(ret)
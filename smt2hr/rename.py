@@ -0,0 +1,82 @@
+import json
+import re
+
+from pysmt.utils import quote
+
+'''
+Renames the symbols of rendered asserts, with a map of symbol names (--varmap) and
+griller's naming scheme (--griller), in one pass over the text.
+
+SYMBOL matches every symbol the printers can output, a quoted 'name' or a simple
+SMT-LIB symbol, and each one is looked up in a dict. A symbol is only renamed once,
+so the cost is one scan of the output whatever the size of the map, instead of a
+str.replace over the whole output per entry of the map. Unlike str.replace, a name
+is never renamed inside a longer one (foo_arg_1 in foo_arg_10).
+'''
+
+# a symbol quoted by the printers, or a simple symbol as defined by SMT-LIB, which
+# also matches the operators and the words the printers use (they are not renamed
+# unless they are in the map)
+SYMBOL = re.compile(r"'(?:[^'\\]|\\.)*'|[~!@$%^&*_\-+=<>.?/A-Za-z][~!@$%^&*_\-+=<>.?/A-Za-z0-9]*")
+
+QUOTED_ESCAPE = re.compile(r"\\(.)")
+
+# MAGMA_<function>_arg_0->.14:flags, griller prefixes the symbols of the harness
+# of a function with MAGMA_ and the fields of a struct with their index
+GRILLER_PREFIX = "MAGMA_"
+GRILLER_FIELD = re.compile(r"->\.\d+:")
+
+class Renamer():
+
+    def __init__(self, mapping=None, griller=False):
+        """
+        :param mapping: dict of symbol name -> new name.
+        :param griller: Also decode griller's names, MAGMA_png_read_chunk_header_arg_0->.14:flags
+            becomes png_read_chunk_header_arg_0->flags. The mapping is looked up with the
+            original name first, then with the decoded one.
+        """
+        self.mapping = dict(mapping or {})
+        self.griller = griller
+        # printed symbol -> printed renamed symbol
+        self.memo = {}
+
+    @classmethod
+    def from_file(cls, path, griller=False):
+        """
+            Renamer with the mapping of a JSON file holding an object of name -> new name.
+        """
+        with open(path, "r") as f:
+            mapping = json.load(f)
+        if not isinstance(mapping, dict):
+            raise ValueError("The variable map must be a JSON object of name -> new name")
+        return cls(mapping, griller)
+
+    def rename_symbol(self, name):
+        """
+            Returns the new name of the symbol called name, name itself if it is not renamed.
+        """
+        if name in self.mapping:
+            return self.mapping[name]
+        if self.griller and name.startswith(GRILLER_PREFIX):
+            decoded = GRILLER_FIELD.sub("->", name[len(GRILLER_PREFIX):])
+            return self.mapping.get(decoded, decoded)
+        return name
+
+    def printed(self, match):
+        symbol = match.group(0)
+        renamed = self.memo.get(symbol)
+        if renamed is None:
+            if symbol[0] == "'":
+                name = QUOTED_ESCAPE.sub(r"\1", symbol[1:-1])
+            else:
+                name = symbol
+            new = self.rename_symbol(name)
+            renamed = symbol if new == name else quote(new, style="'")
+            self.memo[symbol] = renamed
+        return renamed
+
+    def rename(self, text):
+        """
+            Renames the symbols of rendered asserts.
+        """
+        return SYMBOL.sub(self.printed, text)
@@ -0,0 +1,126 @@
+import io
+import json
+import os
+import signal
+import socketserver
+import stat
+import sys
+import threading
+import traceback
+
+from multiprocessing import Pool
+
+from pysmt.environment import reset_env
+
+from .options import ENGINES, READERS
+from .simplify import iter_parse
+
+'''
+Long running conversion server, so that pysmt is imported and the parser set up
+once instead of for every query. Requests and responses are JSON lines:
+
+    {"id": 1, "text": "(declare-fun ...) (assert ...)", "pretty": false, "engine": "tokenizer", "reader": "pysmt"}
+    {"id": 1, "ok": true, "output": "..."}
+    {"id": 1, "ok": false, "error": "..."}
+
+Only "text" is required. The requests are converted by a pool of jobs worker
+processes, which bounds how many run at the same time.
+'''
+
+def convert_text(request):
+    """
+        Convert the SMT-LIB text of one request, this is what the workers run.
+    """
+    # every request gets a fresh formula manager, so the workers do not keep the
+    # formulas of all the queries they have seen
+    reset_env()
+    try:
+        engine = request.get("engine", "tokenizer")
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine: " + str(engine))
+        reader = request.get("reader", "pysmt")
+        if reader not in READERS:
+            raise ValueError("Unknown reader: " + str(reader))
+        output = "\n\n".join(iter_parse(io.StringIO(request["text"]), bool(request.get("pretty", False)), engine,
+                                        reader=reader))
+        return {"ok": True, "output": output}
+    except Exception:
+        return {"ok": False, "error": traceback.format_exc(limit=1).strip().splitlines()[-1]}
+
+class ConversionServer():
+
+    def __init__(self, jobs=1):
+        self.jobs = jobs
+        self.pool = Pool(jobs)
+        # requests waiting for a worker, past this the connections block
+        self.pending = threading.BoundedSemaphore(jobs * 4)
+
+    def handle(self, line):
+        """
+            Handle one request line, returns the response line.
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict) or not isinstance(request.get("text"), str):
+                raise ValueError("A request needs a \"text\" string")
+        except ValueError as e:
+            return json.dumps({"ok": False, "error": "Bad request: " + str(e)})
+        with self.pending:
+            response = self.pool.apply(convert_text, (request,))
+        if "id" in request:
+            response["id"] = request["id"]
+        return json.dumps(response)
+
+    def serve_stdio(self, stdin=sys.stdin, stdout=sys.stdout):
+        for line in stdin:
+            if not line.strip():
+                continue
+            stdout.write(self.handle(line) + "\n")
+            stdout.flush()
+
+    def serve_socket(self, path):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    self.wfile.write(server.handle(line).encode() + b"\n")
+                    self.wfile.flush()
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        if os.path.exists(path):
+            # a socket left behind by a server that was killed, anything else is
+            # not ours to remove
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise ValueError("%s exists and is not a socket" % path)
+            os.remove(path)
+        with Server(path, Handler) as unix_server:
+            try:
+                unix_server.serve_forever()
+            finally:
+                os.remove(path)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+def serve(path, jobs=1):
+    """
+        Serve on the unix socket path, or on stdin and stdout if path is '-'.
+    """
+    server = ConversionServer(jobs)
+    # so that the socket is removed when the server is killed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if path == "-":
+            server.serve_stdio()
+        else:
+            server.serve_socket(path)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
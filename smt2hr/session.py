@@ -0,0 +1,129 @@
+import hashlib
+import io
+
+from pysmt.environment import reset_env
+
+from .reader import split_commands
+from .simplify import iter_parse
+
+'''
+Converts the successive queries of a symbolic execution run, where every query
+repeats the path condition of the one before it and adds a constraint or two.
+
+Every assert is fingerprinted with a hash of its text, before parsing. Only the
+asserts the session has not converted yet go through the pipeline, together with
+the declarations and options of their query, and the result of every query is
+the delta with the one before it: the constraints it added and the ones it
+removed.
+'''
+
+# commands that are not needed to convert the asserts of a query
+SKIPPED_COMMANDS = ["assert", "check-sat", "exit", "get-model", "get-value", "get-info", "push", "pop"]
+
+class Delta():
+    '''
+    The constraints a query added and removed, rendered, in the order of the query
+    and of the query before it. kept is the number of asserts already in the query
+    before it.
+    '''
+
+    __slots__ = ["name", "added", "removed", "kept"]
+
+    def __init__(self, name, added, removed, kept):
+        self.name = name
+        self.added = added
+        self.removed = removed
+        self.kept = kept
+
+    def lines(self):
+        """
+            Yields the delta as text, a '; name: +added -removed' line, then a line
+            per constraint starting with + or -.
+        """
+        yield "; %s: +%d -%d (%d kept)" % (self.name, len(self.added), len(self.removed), self.kept)
+        for sign, rendered in [("+", text) for text in self.added] + [("-", text) for text in self.removed]:
+            yield sign + " " + rendered.replace("\n", "\n  ")
+
+class Session():
+
+    def __init__(self, pretty=False, engine="tokenizer", reader="pysmt", jobs=1, cache=None, renamer=None):
+        """
+        :param pretty, engine, reader, jobs, cache, renamer: How the asserts are converted,
+            see simplify.iter_parse.
+        """
+        if engine == "shared":
+            raise ValueError("The shared engine can not be used in a session, an assert depends on the ones before it")
+        if engine == "smt2inf" and reader == "native":
+            raise ValueError("The smt2inf engine needs the pysmt reader")
+        self.pretty = pretty
+        self.engine = engine
+        self.reader = reader
+        self.jobs = jobs
+        self.cache = cache
+        self.renamer = renamer
+        # fingerprint -> rendered assert, of every assert of the session
+        self.converted = {}
+        # fingerprints of the asserts of the last query, in order
+        self.previous = []
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(text):
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    def update(self, text, name="query"):
+        """
+            Converts the asserts of the query in text that were not converted before.
+        :return: Delta with the query before it.
+        """
+        header = []
+        asserts = []
+        for command, start, end in split_commands(text):
+            if command == "assert":
+                asserts.append(text[start:end])
+            elif command not in SKIPPED_COMMANDS:
+                header.append(text[start:end])
+
+        fingerprints = []
+        new = {}
+        for assert_text in asserts:
+            key = self.fingerprint(assert_text)
+            fingerprints.append(key)
+            if key in self.converted or key in new:
+                self.hits += 1
+            else:
+                self.misses += 1
+                new[key] = assert_text
+        if new:
+            # a fresh formula manager per query, like the files of a batch
+            reset_env()
+            script = "\n".join(header + list(new.values()))
+            rendered = iter_parse(io.StringIO(script), self.pretty, self.engine, self.jobs, self.cache,
+                                  self.reader, renamer=self.renamer)
+            self.converted.update(zip(new, rendered))
+
+        current = set(fingerprints)
+        before = set(self.previous)
+        added = []
+        for key in fingerprints:
+            if key not in before:
+                added.append(self.converted[key])
+                # a constraint repeated in the query is only added once
+                before.add(key)
+        removed = [self.converted[key] for key in dict.fromkeys(self.previous) if key not in current]
+        kept = len(current.intersection(self.previous))
+        self.previous = fingerprints
+        return Delta(name, added, removed, kept)
+
+    def iter_files(self, filenames):
+        """
+            Yields the Delta of every file, in order.
+        """
+        for filename in filenames:
+            with open(filename, "r") as f:
+                text = f.read()
+            yield self.update(text, filename)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "converted": len(self.converted)}
@@ -1,50 +1,520 @@
+import io
 import pysmt
 import re
+import time
+from array import array
+from itertools import islice
 from pysmt.smtlib.parser import SmtLibParser
 
-def parse(fp, pretty=False):
-    p = SmtLibParser()
-    script = p.get_script(fp)
-    ret = ""
-    for asserts in script.filter_by_command_name(["assert"]): 
-        # ret += "assert :\t"
-        # ret += asserts.args[0].serialize()
-        # ret += "\n"
-        # print("-----------------")
-        # print(asserts.args[0].serialize())
-        # print("-----------------")
-        tokens = Tokenizer(asserts.args[0].serialize())
+from .options import READERS
+from .reader import Unsupported, open_pruned, prune_declarations, read_asserts as native_read_asserts
+from .tokens import CLOSE, OPEN, SymbolTable, TokenStore
+
+# Number of asserts per worker process handed out at once by iter_parallel
+PARALLEL_CHUNK = 4
+
+# Characters of a serialized assert scanned at once, the tokens of one chunk are
+# the only strings alive before they are interned
+SCAN_CHUNK = 1024 * 1024
+
+def parse(fp, pretty=False, engine="tokenizer", jobs=1, cache=None, reader="pysmt", profile=None, renamer=None):
+    return "\n\n".join(iter_parse(fp, pretty, engine, jobs, cache, reader, profile, renamer))
+
+def iter_parse(fp, pretty=False, engine="tokenizer", jobs=1, cache=None, reader="pysmt", profile=None, renamer=None, lines=False):
+    '''
+    Yields the rendered asserts one at a time, as soon as each one is read from fp.
+    Only the assert being rendered is kept around, not the whole script.
+
+    With jobs > 1 the asserts are serialized here and rendered by a pool of worker
+    processes, the results are still yielded in the order of the file.
+
+    cache is an AssertCache, which is looked up with the serialized assert before
+    rendering it.
+
+    reader is either pysmt, or native for the reader of the KLEE subset of SMT-LIB
+    in reader.py, which falls back to pysmt for files it does not support.
+
+    profile is a Profile, which gets the time and the tokens of every stage.
+
+    The shared engine prints the subterms used more than once as temporaries, the
+    definitions of the temporaries an assert uses first come right before it. It
+    reads all the asserts before yielding the first one. The smt2inf engine renders
+    C like expressions instead, with smt2inf.AssertStmt.
+
+    renamer is a Renamer, which renames the symbols of every rendered assert. The
+    cache keeps the asserts as they were before renaming.
+
+    With lines, every assert is yielded as an iterable of its lines instead of a
+    string. The lines of the pretty printed asserts are then only rendered as they
+    are consumed, when the assert is not cached.
+    '''
+    if renamer is not None:
+        rendered = iter_parse(fp, pretty, engine, jobs, cache, reader, profile, lines=lines)
+        if lines:
+            yield from (iter_renamed(assert_lines, renamer, profile) for assert_lines in rendered)
+        else:
+            yield from iter_renamed(rendered, renamer, profile)
+        return
+    if lines and (jobs > 1 or engine == "shared" or profile is not None):
+        # only the loop below renders the lines lazily
+        yield from ((rendered,) for rendered in iter_parse(fp, pretty, engine, jobs, cache, reader, profile))
+        return
+    simplifier = None
+    if engine == "dag" or engine == "shared":
+        if jobs > 1:
+            raise ValueError("The %s engine can not render asserts in parallel" % engine)
+        # imported here so that dag can reuse the printers defined below
+        from .dag import DagSimplifier, SharedSimplifier
+        if engine == "shared":
+            if cache is not None:
+                raise ValueError("The shared engine can not use the cache, an assert depends on the ones before it")
+            simplifier = SharedSimplifier()
+        else:
+            simplifier = DagSimplifier()
+    elif engine == "smt2inf":
+        if jobs > 1:
+            raise ValueError("The smt2inf engine can not render asserts in parallel")
+        if reader == "native":
+            # it renders the let bound text of pysmt's to_smtlib, which the nodes of
+            # the native reader do not have
+            raise ValueError("The smt2inf engine needs the pysmt reader")
+        from .smt2inf import InferenceSimplifier
+        simplifier = InferenceSimplifier(profile)
+    elif engine != "tokenizer":
+        raise ValueError("Unknown engine: " + engine)
+    # the tokenizer and the dag engine render the same text, smt2inf has its own
+    # entries in the cache
+    options = (pretty, engine) if engine == "smt2inf" else (pretty,)
+    if engine == "smt2inf":
+        from .smt2inf import cache_string
+    elif simplifier is not None:
+        # the engines working on the DAG key the cache on a form linear in its size,
+        # serialize() would inline the shared subterms they avoid
+        from .dag import dag_string
+        cache_string = dag_string
+    else:
+        cache_string = serialize
+    if profile is not None:
+        start = time.perf_counter()
+        asserts = read_asserts(fp, reader)
+        profile.add("read", time.perf_counter() - start)
+        asserts = profile.timed("parse", asserts)
+    else:
+        asserts = read_asserts(fp, reader)
+    if jobs > 1:
+        yield from iter_parallel(asserts, pretty, jobs, cache, profile)
+        return
+    if engine == "shared":
+        yield from iter_shared(asserts, pretty, simplifier, profile)
+        return
+    # the asserts of a file share their symbols
+    symbols = SymbolTable()
+    if profile is not None:
+        yield from iter_profiled(asserts, pretty, simplifier, cache, profile, symbols, engine, options, cache_string)
+        return
+    for formula in asserts:
+        if cache is not None:
+            string = cache_string(formula)
+            key = cache.key(string, *options)
+            rendered = cache.get(key)
+            if rendered is not None:
+                yield (rendered,) if lines else rendered
+                continue
+        if simplifier is not None:
+            tokens = simplifier.simplify(formula)
+        elif cache is not None:
+            tokens = Tokenizer(string, symbols=symbols)
+        else:
+            tokens = Tokenizer(formula.serialize(), symbols=symbols)
+        if lines and pretty and cache is None and isinstance(tokens, TokenPrinter):
+            yield tokens.pretty_lines()
+            continue
         if pretty:
-            ret += tokens.pretty_print()
+            rendered = tokens.pretty_print()
         else:
-            ret += tokens.tokens_to_string()
-        ret += '\n\n'
-    return ret[:-2]
+            rendered = tokens.tokens_to_string()
+        if cache is not None:
+            cache.put(key, rendered)
+        yield (rendered,) if lines else rendered
+
+def iter_profiled(asserts, pretty, simplifier, cache, profile, symbols, engine="tokenizer", options=None, cache_string=None):
+    '''
+    The loop of iter_parse, adding every stage of every assert to profile. It is
+    kept apart so that the loop without a profile does not pay for the timing.
+    '''
+    clock = time.perf_counter
+    for formula in asserts:
+        start = clock()
+        string = None
+        rendered = None
+        token_count = 0
+        if simplifier is None:
+            string = formula.serialize()
+            profile.add("serialize", clock() - start)
+        elif cache is not None:
+            string = cache_string(formula)
+            profile.add("serialize", clock() - start)
+        if cache is not None:
+            lookup = clock()
+            key = cache.key(string, *(options or (pretty,)))
+            rendered = cache.get(key)
+            profile.add("cache get", clock() - lookup)
+        if rendered is None:
+            if simplifier is not None:
+                simplified = clock()
+                tokens = simplifier.simplify(formula)
+                if engine == "smt2inf":
+                    # the tokens of an AssertStmt are nested lists
+                    from .smt2inf import count_tokens
+                    token_count = count_tokens(tokens.tokens)
+                else:
+                    token_count = len(tokens.tokens)
+                profile.add(engine, clock() - simplified, token_count)
+            else:
+                tokens = Tokenizer(string, profile=profile, symbols=symbols)
+                token_count = len(tokens.tokens)
+            render = clock()
+            if pretty:
+                rendered = tokens.pretty_print()
+                profile.add("pretty_print", clock() - render)
+            else:
+                rendered = tokens.tokens_to_string()
+                profile.add("tokens_to_string", clock() - render)
+            if cache is not None:
+                store = clock()
+                cache.put(key, rendered)
+                profile.add("cache put", clock() - store)
+        profile.add_assert(clock() - start, len(string) if string is not None else 0, token_count)
+        yield rendered
+
+def serialize(formula):
+    return formula.serialize()
+
+def iter_renamed(rendered, renamer, profile=None):
+    '''
+    Renames the symbols of the rendered asserts, as they are yielded.
+    '''
+    if profile is None:
+        yield from map(renamer.rename, rendered)
+        return
+    for text in rendered:
+        start = time.perf_counter()
+        text = renamer.rename(text)
+        profile.add("rename", time.perf_counter() - start)
+        yield text
+
+def iter_shared(asserts, pretty, simplifier, profile=None):
+    '''
+    The loop of iter_parse for the shared engine. The references are counted over
+    all the asserts, then every assert is yielded after the definitions of the
+    temporaries it uses first, one per line.
+    '''
+    clock = time.perf_counter
+    formulas = list(asserts)
+    start = clock()
+    simplifier.count(formulas)
+    if profile is not None:
+        profile.add("count", clock() - start)
+    for formula in formulas:
+        start = clock()
+        definitions, tokens = simplifier.simplify(formula)
+        if profile is not None:
+            profile.add("shared", clock() - start, len(tokens.tokens))
+        render = clock()
+        if pretty:
+            rendered = tokens.pretty_print()
+        else:
+            rendered = tokens.tokens_to_string()
+        if profile is not None:
+            profile.add("pretty_print" if pretty else "tokens_to_string", clock() - render)
+            profile.add_assert(clock() - start, 0, len(tokens.tokens))
+        yield "\n".join(definitions + [rendered])
+
+def read_asserts(fp, reader="pysmt"):
+    '''
+    Returns an iterator over the formulas of the asserts in fp. The declarations
+    no assert refers to are dropped before parsing, so that only the symbols the
+    asserts use are built. With pysmt, a seekable fp is read twice instead of
+    being held in memory.
+    '''
+    if reader not in READERS:
+        raise ValueError("Unknown reader: " + reader)
+    if reader == "native":
+        # the native reader works on the whole text
+        text = prune_declarations(fp.read())
+        try:
+            return iter(native_read_asserts(text))
+        except Unsupported:
+            source = io.StringIO(text)
+    elif seekable(fp):
+        # pysmt streams the file, which is pruned in two passes instead of held
+        source = open_pruned(fp)
+    else:
+        source = io.StringIO(prune_declarations(fp.read()))
+    p = SmtLibParser()
+    commands = p.get_command_generator(source)
+    return (cmd.args[0] for cmd in commands if cmd.name == "assert")
+
+def seekable(fp):
+    try:
+        return fp.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+def iter_parallel(asserts, pretty, jobs, cache, profile=None):
+    '''
+    Renders the asserts on a pool of worker processes, a chunk at a time so that
+    only a few asserts per worker are held in memory. Cached asserts are not sent
+    to the workers. The profile only gets the time of the chunks, the stages run
+    in the workers.
+    '''
+    # imported here, multiprocessing is slow to import and only needed with jobs > 1
+    from multiprocessing import Pool
+    with Pool(jobs) as pool:
+        while True:
+            formulas = list(islice(asserts, jobs * PARALLEL_CHUNK))
+            start = time.perf_counter()
+            strings = [formula.serialize() for formula in formulas]
+            if profile is not None:
+                profile.add("serialize", time.perf_counter() - start)
+            if not strings:
+                return
+            keys = [None] * len(strings)
+            rendered = [None] * len(strings)
+            if cache is not None:
+                for i, string in enumerate(strings):
+                    keys[i] = cache.key(string, pretty)
+                    rendered[i] = cache.get(keys[i])
+            missing = [i for i in range(len(strings)) if rendered[i] is None]
+            start = time.perf_counter()
+            for i, result in zip(missing, pool.map(render_string, [(strings[i], pretty) for i in missing])):
+                rendered[i] = result
+                if cache is not None:
+                    cache.put(keys[i], result)
+            if profile is not None:
+                profile.add("workers", time.perf_counter() - start)
+            yield from rendered
+
+def render_string(args):
+    '''
+    Renders one serialized assert, this is what the worker processes of iter_parse run.
+    '''
+    string, pretty = args
+    tokens = Tokenizer(string)
+    if pretty:
+        return tokens.pretty_print()
+    return tokens.tokens_to_string()
 
 OPERATORS = ['&', '<', '>', 's<', 's>', '%', 'u%']
 
+# A single piece of a concat chain, e.g. foo_arg_1[3] or foo_arg_1[2:0]
+ARRAY_PIECE = re.compile(r"^([\w'->.:]+)\[(\d+)[\d:]*?\]$")
+ARRAY_RANGE = re.compile(r"^([\w'->.:]+)\[[\d:]*?(\d+)\]$")
+
+# An index with one of the bit widths we strip, [10_32]
+INDEX_WIDTH = re.compile(r"\[(\d+)_(?:1|8|16|32|64|128|256)\]")
+
+# One token of the serialized string, which is either a paren, a constant with a
+# bit width we strip (10_32), or anything else up to the next space or paren.
+# Like tokenize, a space right after a paren or another space starts a token, the
+# space ending a token is consumed, and a token at the very end is dropped.
+SCANNER = re.compile(r"([()])|(\d+)_(?:1|8|16|32|64|128|256)(?=[ ()]) ?|( ?[^() ]+| )(?=[ ()]) ?")
+
+def collapse_array_pieces(pieces):
+    '''
+    Collapses the pieces of a concat chain that all read from the same array,
+    ['foo_arg_1[3]', 'foo_arg_1[2:0]'] becomes 'foo_arg_1[3:0]'. Returns None if
+    the pieces can not be collapsed.
+    '''
+    first = ARRAY_PIECE.match(pieces[0])
+    last = ARRAY_RANGE.match(pieces[-1])
+    if not first or not last:
+        return None
+    for piece in pieces[1:]:
+        match = ARRAY_PIECE.match(piece)
+        if not match or match.group(1) != first.group(1):
+            return None
+    return first.group(1) + "[" + first.group(2) + ":" + last.group(2) + "]"
+
+def collapse_chain(token):
+    '''
+    foo_arg_0_dynSize[3_32]::foo_arg_0_dynSize[2:0] becomes foo_arg_0_dynSize[3:0]
+    '''
+    if "::" not in token or token.endswith("::"):
+        return token
+    collapsed = collapse_array_pieces(token.split("::"))
+    if collapsed is None:
+        return token
+    return collapsed
+
 '''
 (((5_32 = ((foo_arg_0_dynSize[3_32]::(foo_arg_0_dynSize[2_32]::(foo_arg_0_dynSize[1_32]::foo_arg_0_dynSize[0_32]))) u% 129_32)) & ((foo_arg_1[3_32]::(foo_arg_1[2_32]::(foo_arg_1[1_32]::foo_arg_1[0_32]))) s< (foo_arg_2[3_32]::(foo_arg_2[2_32]::(foo_arg_2[1_32]::foo_arg_2[0_32]))))) & (131068_32 = (4_64 * ((foo_arg_1[3_32]::(foo_arg_1[2_32]::(foo_arg_1[1_32]::foo_arg_1[0_32]))) SEXT 32))[0:31]))
 
 We need to tokenize this string into a list of tokens, that we can parse into a tree and then modify and simplify.
 '''
 
-class Tokenizer():
+class TokenPrinter():
+    '''
+    Renders simplified tokens, either on a single line or pretty printed with one
+    conjunct per line. The tokens are a TokenStore, or a list of strings which is
+    interned into one.
+    '''
+
+    def __init__(self, tokens):
+        if not isinstance(tokens, TokenStore):
+            tokens = TokenStore(tokens)
+        self.tokens = tokens
+
+    def tokens_to_string(self):
+        return self.tokens.render()
+
+    def specific_tokens_to_string(self, tokens):
+        return join_tokens(tokens, 0, len(tokens))
+
+    def split_tokens(self, tokens):
+        '''
+        The original recursive pretty printer, kept as the reference pretty_lines is
+        checked against by bench/bench_pretty.py. It recurses once per level and
+        copies the tokens at every split.
+        '''
+        # We remove the first and last ( and )
+        if tokens[0] != "(" or tokens[-1] != ")":
+            return "\t" + self.specific_tokens_to_string(tokens)
+        if tokens[1] != "(":
+            return "\t" + self.specific_tokens_to_string(tokens)
+        del tokens[0]
+        del tokens[-1]
+
+        indent = 0 
+        for i in range(len(tokens)):
+            if tokens[i] == "(":
+                indent += 1
+                endline = True
+            elif tokens[i] == ")":
+                indent -= 1
+                endline = True
+        
+            if indent == 0:
+                # We got the split point
+                return self.split_tokens(tokens[:i+1]) + "\n\t" + self.specific_tokens_to_string(tokens[i+1:])
+
+    def pretty_lines(self):
+        '''
+        Yields the lines of the pretty printed tokens. While the tokens are of the
+        form ( ( A ) rest ), the outer parens are dropped and A is split again, then
+        the innermost A is printed followed by the rests from the inside out:
+
+            ( ( ( x & y ) | z ) & w )  ->  x & y
+                                           | z
+                                           & w
+
+        The left spine is walked with an explicit stack over index ranges, so this
+        runs in linear time at any depth and copies nothing.
+        '''
+        store = self.tokens
+        values = store.values
+        if not values:
+            return
+        matching = store.matching_parens()
+        kinds = store.token_kinds()
+        rests = []
+        start, end = 0, len(values)
+        while end - start > 1 and values[start] == OPEN and values[end - 1] == CLOSE and values[start + 1] == OPEN:
+            close = matching[start + 1]
+            if close < 0 or close >= end - 1:
+                break
+            rests.append((close + 1, end - 1))
+            start, end = start + 1, close + 1
+        yield "\t" + store.render(start, end, kinds)
+        for rest in reversed(rests):
+            yield "\t" + store.render(rest[0], rest[1], kinds)
+
+    def pretty_print(self):
+        return "\n".join(self.pretty_lines())
+
+def join_tokens(tokens, start, end):
+    '''
+    Renders tokens[start:end] on one line, with a space before every token that
+    does not follow or is not a paren. Like the original printer, the first token
+    looks at the last one, tokens[start - 1] wraps around to tokens[end - 1].
+    TokenStore.render does the same on interned tokens.
+    '''
+    if start >= end:
+        return ""
+    parts = []
+    previous = tokens[end - 1]
+    for i in range(start, end):
+        token = tokens[i]
+        if token == "(" or token == ")" or previous == "(" or previous == ")":
+            parts.append(token)
+        else:
+            parts.append(" " + token)
+        previous = token
+    return "".join(parts)
+
+class Tokenizer(TokenPrinter):
 
-    def __init__(self, string):
+    def __init__(self, string, reference=False, profile=None, symbols=None):
+        '''
+        reference selects the original character by character lexer followed by
+        remove_bit_width_from_tokens, instead of scan which does both in one pass.
+        The other passes work on the tokens interned in a TokenStore.
+
+        profile is a Profile, which gets the time and the tokens left by every pass.
+
+        symbols is the SymbolTable the tokens are interned in, the Tokenizers of the
+        asserts of a file share one.
+        '''
         self.string = string
+        self.symbols = symbols if symbols is not None else SymbolTable()
         self.tokens = []
         self.token = ""
         self.in_string = False
         self.in_token = False
         self.in_paren = False
         self.paren_count = 0
-        self.tokenize()
-        self.remove_bit_width_from_tokens()
-        self.concatnating_arrays()
-        self.remove_uneeded_parens()
+        if reference:
+            passes = [self.tokenize, self.remove_bit_width_from_tokens, self.intern_tokens]
+        else:
+            passes = [self.scan]
+        passes += [self.concatnating_arrays, self.remove_uneeded_parens]
+        if profile is None:
+            for stage in passes:
+                stage()
+        else:
+            for stage in passes:
+                start = time.perf_counter()
+                stage()
+                profile.add(stage.__name__, time.perf_counter() - start, len(self.tokens))
+
+    def scan(self):
+        '''
+        Produces the same tokens as tokenize followed by remove_bit_width_from_tokens,
+        interned in a TokenStore. Indexes like [10_32] are rewritten first, then SCANNER
+        splits the string into tokens and strips the bit width of constants in the
+        same match.
+
+        Long strings are scanned a chunk at a time. A chunk ends right after a '(',
+        where no token can continue and the scanner starts over in the same state.
+        '''
+        store = TokenStore(symbols=self.symbols)
+        string = self.string
+        start = 0
+        while start < len(string):
+            end = string.find("(", start + SCAN_CHUNK) + 1 or len(string)
+            chunk = INDEX_WIDTH.sub(r"[\1]", string[start:end])
+            store.extend(paren or number or token for paren, number, token in SCANNER.findall(chunk))
+            start = end
+        self.tokens = store
+
+    def intern_tokens(self):
+        '''
+        Interns the list of tokens of the reference lexer in a TokenStore.
+        '''
+        self.tokens = TokenStore(self.tokens, self.symbols)
 
     def tokenize(self):
+        self.tokens = []
         for char in self.string:
             if char == "(":
                 # self.in_paren = True
@@ -115,63 +585,43 @@ class Tokenizer():
 
         it needs to be replaced with a single token
         ['foo_arg_0_dynSize[3:0]']
+
+        This is done in a single pass with the output list used as a stack, every ')'
+        that closes the innermost part of a chain merges it into the part before it,
+        so chains of any length are collapsed in linear time.
+
+        The tokens are interned, so every distinct token is collapsed once, and the
+        merges are remembered by the ids of their two parts, in the SymbolTable.
         '''
-        NROUNDS = 20
-        for rnd in range(NROUNDS):
-            # Let's first reduce any token with a '::' in the middle
-            for i in range(len(self.tokens) - 1):
-                if i > len(self.tokens) - 1:
-                    break
-                if self.tokens[i] == "(" or self.tokens[i] == ")" or self.tokens[i] in OPERATORS:
-                    continue
-                if "::" in self.tokens[i]:
-                    split_tokens = self.tokens[i].split("::")
-                    if len(split_tokens[-1]) != 0:
-                        """
-                        Handling the case where the token is of the form
-                        foo_arg_0_dynSize[3_32]::foo_arg_0_dynSize[2_32]::foo_arg_0_dynSize[1_32]::foo_arg_0_dynSize[0_32]
-                        """
-                        #print("split_tokens: ", split_tokens) 
-                        replace = False
-                        first_idx = -1
-                        last_idx = -1
-                        name = ""
-                        for j in range(len(split_tokens) - 1):
-                            # Check if the current split and then next split are in the form of
-                            # foo_arg_0[1] or foo_arg_0[2]
-                            first = re.match(r"^([\w'->.:]+)\[(\d+)[\d:]*?\]$", split_tokens[j])
-                            second = re.match(r"^([\w'->.:]+)\[[\d:]*?(\d+)\]$", split_tokens[j+1])
-                            if first and second:
-                                if first.group(1) == second.group(1):
-                                    replace = True
-                                    name = first.group(1)
-                                    if first_idx == -1:
-                                        first_idx = int(first.group(2))
-                                    last_idx = int(second.group(2))
-                                else:
-                                    replace = False
-                                    break
-                        if replace:
-                            #print(f"Replacing {self.tokens[i]} with {name}[{first_idx}:{last_idx}]")
-                            self.tokens[i] = name + "[" + str(first_idx) + ":" + str(last_idx) + "]"
-                    else:
-                        """
-                        Handling the case where the token is of the form
-                        'foo_arg_0_dynSize[3_32]::foo_arg_0_dynSize[2_32]::', '(', 'foo_arg_0_dynSize[1_32]::foo_arg_0_dynSize[0_32]', ')'
-                        """
-                        # Let's check if there are 3 more tokens after this
-                        if i + 3 > len(self.tokens):
-                            continue
-
-                        # Let's check if the next 3 tokens are of the form
-                        # '(', 'foo_arg_0_dynSize[1_32]::foo_arg_0_dynSize[0_32]', ')'
-                        if self.tokens[i+1] != "(" or self.tokens[i+3] != ")":
-                            continue
-
-                        self.tokens[i] = self.tokens[i] + self.tokens[i+2]
-                        del self.tokens[i+1]
-                        del self.tokens[i+1]
-                        del self.tokens[i+1]
+        store = self.tokens
+        symbols = store.symbols
+        strings = symbols.strings
+        collapsed = symbols.collapsed
+        while len(collapsed) < len(symbols):
+            symbol = len(collapsed)
+            collapsed.append(symbols.intern(self.collapse_chain(strings[symbol])) if symbol > CLOSE else symbol)
+        merged = symbols.merged
+        # a list is a faster stack than an array, which boxes every id it returns
+        tokens = []
+        for symbol in map(collapsed.__getitem__, store.values):
+            if symbol == CLOSE and len(tokens) > 2 and tokens[-2] == OPEN and \
+                    tokens[-1] > CLOSE and tokens[-3] > CLOSE and strings[tokens[-3]].endswith("::"):
+                """
+                Handling the case where the tokens are of the form
+                'foo_arg_0_dynSize[2_32]::', '(', 'foo_arg_0_dynSize[1:0]', ')'
+                """
+                inner = tokens.pop()
+                tokens.pop()
+                key = (tokens[-1], inner)
+                if key not in merged:
+                    merged[key] = symbols.intern(self.collapse_chain(strings[tokens[-1]] + strings[inner]))
+                tokens[-1] = merged[key]
+            else:
+                tokens.append(symbol)
+        store.values = array("i", tokens)
+
+    def collapse_chain(self, token):
+        return collapse_chain(token)
 
     def remove_uneeded_parens(self):
         '''
@@ -180,74 +630,7 @@ class Tokenizer():
 
         we need to delete the first and last token
         '''
-        for i in range(len(self.tokens) - 1):
-            if i > len(self.tokens) - 1:
-                break
-            if self.tokens[i] == "(" and self.tokens[i+2] == ")":
-                del self.tokens[i]
-                del self.tokens[i+1]
-
-    def tokens_to_string(self):
-        ret = ""
-        for i in range(len(self.tokens)):
-            if self.tokens[i] == "(" or self.tokens[i] == ")":
-                ret += self.tokens[i]
-            elif self.tokens[i - 1] == "(" or self.tokens[i - 1] == ")":
-                ret += self.tokens[i]
-            else:
-                ret += " " + self.tokens[i]
-        return ret
-
-    def specific_tokens_to_string(self, tokens):
-        ret = ""
-        for i in range(len(tokens)):
-            if tokens[i] == "(" or tokens[i] == ")":
-                ret += tokens[i]
-            elif tokens[i - 1] == "(" or tokens[i - 1] == ")":
-                ret += tokens[i]
-            else:
-                ret += " " + tokens[i]
-        return ret
-
-    def split_tokens(self, tokens):
-        # We remove the first and last ( and )
-        if tokens[0] != "(" or tokens[-1] != ")":
-            return "\t" + self.specific_tokens_to_string(tokens)
-        if tokens[1] != "(":
-            return "\t" + self.specific_tokens_to_string(tokens)
-        del tokens[0]
-        del tokens[-1]
-
-        indent = 0 
-        for i in range(len(tokens)):
-            if tokens[i] == "(":
-                indent += 1
-                endline = True
-            elif tokens[i] == ")":
-                indent -= 1
-                endline = True
-        
-            if indent == 0:
-                # We got the split point
-                return self.split_tokens(tokens[:i+1]) + "\n\t" + self.specific_tokens_to_string(tokens[i+1:])
-
-    def pretty_print(self):
-        ret = ""
-        indent = 0
-        endline = False
-        
-        initial = 0
-        for i in range(len(self.tokens)):
-            if self.tokens[i] == "(":
-                initial += 1
-            else:
-                break
-    
-        ret += self.split_tokens(self.tokens.copy())
-        return ret
-                    
-
-            
+        self.tokens.remove_wrapped()
 
 def remove_bit_width(data):
     return tokens.tokens_to_string()
\ No newline at end of file
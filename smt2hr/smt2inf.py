@@ -2,59 +2,78 @@ from __future__ import annotations
 
 import re
 import sys
+import time
 
 from typing import List, Tuple, Any
 from pysmt.smtlib.parser import SmtLibParser, SmtLibScript
 from pysmt.environment import get_env
+from pysmt.utils import quote
 
-from more_itertools import peekable
+from smt2hr.dag import dag_string
+from smt2hr.reader import open_pruned
+
+'''
+Infers C like expressions from the asserts, as serialized by pysmt with their
+shared subterms bound by lets: (let ((.def_0 (select foo_arg_1 #b0...))) ...)
+
+The serialized assert is read into nested lists by an iterative reader, every
+.def_N binding is rendered once (smt_vars), in the order of the lets, and the
+expressions are evaluated with an explicit stack, so long let chains and deep
+expressions do not hit the recursion limit. The operators are looked up in
+OPERATORS and INDEXED_OPERATORS, which cover the bit vector operators of QF_AUFBV.
+'''
+
+# s-expression tokens: parens, |quoted symbols| and anything else up to a space or paren
+SEXPR_TOKEN = re.compile(r"(\()|(\))|\|([^|]*)\||([^\s()|]+)")
+
+def read_sexpr(text):
+    """
+        Reads the s-expressions of text into nested lists of strings, without
+        recursion. Empty lists are dropped and quoted symbols lose their bars.
+    """
+    stack = [[]]
+    for match in SEXPR_TOKEN.finditer(text):
+        kind = match.lastindex
+        if kind == 1:
+            stack.append([])
+        elif kind == 2:
+            if len(stack) == 1:
+                raise ValueError("Unbalanced ')' at %d" % match.start())
+            done = stack.pop()
+            if done:
+                stack[-1].append(done)
+        else:
+            stack[-1].append(match.group(kind))
+    if len(stack) != 1:
+        raise ValueError("Unbalanced '(' in " + text[:80])
+    return stack[0]
 
 class Stmt(object):
 
-    def __init__(self, name, serialized):
+    def __init__(self, name, serialized, profile=None):
         if not isinstance(name, str):
             if len(name) > 1:
                 raise ValueError("Name should be a single one.")
 
-            self.name = str(name[0])
+            # str() quotes the names that are not simple symbols
+            self.name = name[0].symbol_name() if hasattr(name[0], "symbol_name") else str(name[0])
         else:
             self.name = name
 
         self.serialized = serialized
-        
-        self.stmt = self.stmt_gen()
-        
-        self.tokens = self.tokenize()
+
+        if profile is None:
+            self.tokens = self.tokenize()
+        else:
+            start = time.perf_counter()
+            self.tokens = self.tokenize()
+            profile.add("smt2inf tokenize", time.perf_counter() - start, count_tokens(self.tokens), nested=True)
         if len(self.tokens) == 1:
             self.tokens = self.tokens[0]
 
-    def stmt_gen(self):
-        for i in self.serialized:
-            yield i
-
     def tokenize(self):
-        curr_name = ""
-        tokens = []
-        while True:
-            try:
-                tok = next(self.stmt)
-            except StopIteration:
-                return tokens
-            if tok == "(":
-                sub_tokens = self.tokenize()
-                if sub_tokens != []:
-                    tokens.append(sub_tokens)
-            elif tok == ")":
-                if curr_name != "":
-                    tokens.append(curr_name)
-                return tokens
-            elif tok == " ":
-                if curr_name != "":
-                    tokens.append(curr_name)
-                curr_name = ""
-            else:
-                curr_name += tok
-    
+        return read_sexpr(self.serialized)
+
     def __str__(self):
         ret = "Name: " + self.name + "\n"
         ret += "Statement: " + self.serialized + "\n"
@@ -83,144 +102,253 @@ class DeclStmt(Stmt):
                 else:
                     raise ValueError("Unexpected token: " + token)
             # Now, I have only seen Arrays usually
-            # so I am ignoring the rest 
+            # so I am ignoring the rest
             elif isinstance(token, list):
                 # if it's an array, it should have 2 elements
                 if token[0] == "Array":
                     ttype = token[0]
         return tname, ttype
 
+class Value(object):
+    '''
+    A rendered expression and its bit width (None for booleans and symbols of
+    unknown sort). array is set when the value is bytes read from a single array,
+    conjuncts are the operands of a conjunction, flattened.
+
+    The text is kept as parts, strings and the Values of the operands, and only
+    joined by render. A long chain of bindings is then rendered in linear time,
+    instead of copying the text of every binding into the next one.
+    '''
+
+    __slots__ = ["parts", "width", "array", "conjuncts"]
+
+    def __init__(self, parts, width=None, array=None, conjuncts=None):
+        self.parts = parts
+        self.width = width
+        self.array = array
+        self.conjuncts = conjuncts
+
+    @classmethod
+    def atom(cls, text, width=None):
+        return cls((text,), width)
+
+    def render(self):
+        out = []
+        todo = [self]
+        while todo:
+            part = todo.pop()
+            if isinstance(part, str):
+                out.append(part)
+            else:
+                todo.extend(reversed(part.parts))
+        return "".join(out)
+
+def joined(operator, args):
+    """
+        The parts of (arg operator arg ...).
+    """
+    parts = ["("]
+    for i, arg in enumerate(args):
+        if i > 0:
+            parts.append(operator)
+        parts.append(arg)
+    parts.append(")")
+    return parts
+
+def infix(operator, boolean=False):
+    def render(stmt, args):
+        return Value(joined(" %s " % operator, args), None if boolean else args[0].width)
+    return render
+
+def cast(value, signed):
+    """
+        value cast to the signed or unsigned integer of its width, (int32)x or
+        (uint32)x, or (signed)x when the width is not known.
+    """
+    if value.width is None:
+        return Value(("(%s)" % ("signed" if signed else "unsigned"), value))
+    return Value(("(%sint%d)" % ("" if signed else "u", value.width), value), value.width)
+
+def typed(operator, signed, boolean=False, first_only=False):
+    """
+        An infix operator whose result depends on the signedness of its operands,
+        which are cast so that bvudiv and bvsdiv do not both print /. Only the
+        shifted operand is cast for shifts.
+    """
+    def render(stmt, args):
+        operands = [cast(arg, signed) if i == 0 or not first_only else arg for i, arg in enumerate(args)]
+        return Value(joined(" %s " % operator, operands), None if boolean else args[0].width)
+    return render
+
+def prefix(operator):
+    def render(stmt, args):
+        return Value((operator, args[0]), args[0].width)
+    return render
+
+def negated(operator):
+    def render(stmt, args):
+        return Value(["~"] + joined(" %s " % operator, args), args[0].width)
+    return render
+
+def call(function, width=None):
+    def render(stmt, args):
+        return Value([function] + joined(", ", args), width(args) if width is not None else args[0].width)
+    return render
+
+def conjunction(stmt, args):
+    conjuncts = []
+    for arg in args:
+        conjuncts.extend(arg.conjuncts or [arg])
+    return Value(joined(" and ", args), None, conjuncts=conjuncts)
+
+def implication(stmt, args):
+    return Value(("(not ", args[0], " or ", args[1], ")"))
+
+def ite(stmt, args):
+    return Value(("(", args[0], " ? ", args[1], " : ", args[2], ")"), args[1].width)
+
+def select(stmt, args):
+    # ['select', 'foo_arg_1', '#b00000000000000000000000000000000']
+    array, index = args
+    name = array.render()
+    stmt.program_var_sizes[name] = stmt.predict_size(index.render())
+    return Value((name,), 8, array=name)
+
+def concat(stmt, args):
+    # ['.def_21', ['concat', '.def_20', '.def_19']], the reads of one array
+    # are the program variable itself
+    high, low = args
+    if high.array is not None and high.array == low.array:
+        return Value((high.array,), high.width + low.width, array=high.array)
+    if low.width is None:
+        raise ValueError("Concatenation with a value of unknown width: " + low.render())
+    return Value(("((", high, " << %d) | " % low.width, low, ")"), (high.width or 0) + low.width)
+
+def extract(stmt, indices, args):
+    # [['_', 'extract', '31', '0'], '.def_8']
+    start, end = indices
+    if end == 0:
+        return Value(("(int%d)(" % (start + 1), args[0], ")"), start + 1)
+    return Value(("(int%d)(" % (start - end + 1), args[0], " >> %d)" % end), start - end + 1)
+
+def extension(signed):
+    def render(stmt, indices, args):
+        # [['_', 'sign_extend', '32'], '.def_6']
+        width = (args[0].width or 0) + indices[0]
+        return Value(("(%sint%d)(" % ("" if signed else "u", width), args[0], ")"), width)
+    return render
+
+def indexed_call(function):
+    def render(stmt, indices, args):
+        return Value((function + "(", args[0], ", %d)" % indices[0]),
+                     args[0].width * indices[0] if function == "repeat" and args[0].width else args[0].width)
+    return render
+
+# operator -> function(stmt, args) returning the Value of the application
+OPERATORS = {
+    "bvadd": infix("+"), "bvsub": infix("-"), "bvmul": infix("*"),
+    "bvudiv": typed("/", False), "bvsdiv": typed("/", True),
+    "bvurem": typed("%", False), "bvsrem": typed("%", True), "bvsmod": call("smod"),
+    "bvand": infix("&"), "bvor": infix("|"), "bvxor": infix("^"),
+    "bvnand": negated("&"), "bvnor": negated("|"), "bvxnor": negated("^"),
+    "bvshl": infix("<<"), "bvlshr": typed(">>", False, first_only=True), "bvashr": typed(">>", True, first_only=True),
+    "bvnot": prefix("~"), "bvneg": prefix("-"),
+    "bvult": typed("<", False, True), "bvule": typed("<=", False, True),
+    "bvugt": typed(">", False, True), "bvuge": typed(">=", False, True),
+    "bvslt": typed("<", True, True), "bvsle": typed("<=", True, True),
+    "bvsgt": typed(">", True, True), "bvsge": typed(">=", True, True),
+    "bvcomp": call("bvcomp", lambda args: 1),
+    "=": infix("==", True), "distinct": infix("!=", True),
+    "and": conjunction, "or": infix("or", True), "xor": infix("!=", True),
+    "=>": implication, "not": prefix("not "), "ite": ite,
+    "concat": concat, "select": select, "store": call("store"),
+}
+
+# indexed operator, (_ extract 31 0) -> function(stmt, indices, args)
+INDEXED_OPERATORS = {
+    "extract": extract,
+    "sign_extend": extension(True),
+    "zero_extend": extension(False),
+    "repeat": indexed_call("repeat"),
+    "rotate_left": indexed_call("rotl"),
+    "rotate_right": indexed_call("rotr"),
+}
+
 class AssertStmt(Stmt):
-    
+
     ignore_tokens_list = ["assert"]
 
-    def __init__(self, name, serialized):
-        super().__init__(name, serialized)
-        self.program_var_sizes = {}
+    def __init__(self, name, serialized, profile=None, program_var_sizes=None):
+        super().__init__(name, serialized, profile)
+        # symbol name -> bit width, of the bit vector symbols of the assert
+        self.program_var_sizes = program_var_sizes if program_var_sizes is not None else {}
+        # .def_N -> Value, every binding is rendered once
         self.smt_vars = {}
-        print(self.serialized)
-        self.tokenizer = peekable(self.tokens)
-        self.tokens = self.simplify_tokens(self.tokens)
-
-    def simplify_tokens(self, tokens):
-        new_tokens = []
-        for token in tokens:
-            if isinstance(token, list):
-                if len(token) == 1 and isinstance(token[0], list):
-                    token = token[0]
-                new_tokens.append(self.simplify_tokens(token))
-            else:
-                new_tokens.append(token)
-        return new_tokens
-
+        self.value = None
 
+    def parse_value(self, tokens = None):
+        """
+            Returns the Value of the assert, following the let bindings in order.
+        """
+        if tokens is None:
+            tokens = self.tokens
+        # ['assert', ['let', [['.def_0', [...]]], ['let', ...]]]
+        body = tokens[1]
+        while isinstance(body, list) and body[0] == "let":
+            for binding in body[1]:
+                if not isinstance(binding, list) or len(binding) != 2:
+                    raise ValueError(f"Unexpected let binding: {binding}")
+                self.smt_vars[binding[0]] = self.evaluate(binding[1])
+            body = body[2]
+        self.value = self.evaluate(body)
+        return self.value
 
     def parse_stmt(self, tokens = None):
-        token = tokens[1]
-        while True:
-            if isinstance(token, str):
-                # if token can be ignored, ignore it
-                # all smt2 tokens are ignored
-                # if token in self.ignore_tokens_list:
-                #     token = tokens[1] 
-                #     continue
-                if self.is_variable(token):
-                    return self.smt_vars[token]
-                # if the token is the arg let's save it
-                else:
-                    raise ValueError("Unexpected token: " + token)
-            # Now, I have only seen Arrays usually
-            # so I am ignoring the rest 
-            elif isinstance(token, list):
-                # if it's an array, it should have 2 elements
-                type_tok = token[0]
-                if type_tok == "let":
-                    assert(isinstance(token[1], list) == True)
-                    assert(len(token[1]) == 2)
-                    let_token = token[1]
-                    expr = self.parse_expr(let_token[1])
-                    self.smt_vars[let_token[0]] = expr
-                    token = token[2:]
-                elif isinstance(token, list):
-                    token = token[0]
-                else:
-                    raise ValueError(f"Unexpected token: {token}")
-
-    def parse_expr(self, tokens):
-        if isinstance(tokens, list):
-            if isinstance(tokens[0], str):
-                # unpacking
-                if len(tokens) == 3:
-                    func, arg1, arg2 = tokens
-                else:
-                    func, arg1, arg2 = tokens[0], tokens[1], tokens[2:]
-                
-                # operations
-                if func == "select":
-                    # ['select', 'foo_arg_1', '#b00000000000000000000000000000000']
-                    self.program_var_sizes[arg1] = self.predict_size(arg2)
-                    return arg1
-                elif func == "concat":
-                    # ['.def_21', ['concat', '.def_20', '.def_19']]
-                    arg1_var = self.smt_vars[arg1]
-                    arg2_var = self.smt_vars[arg2]
-                    if arg1_var == arg2_var:
-                        return arg1_var
-                    else:
-                        raise ValueError("Concatenation of different variables")
-                elif func == "_":
-                    # ['_', 'sign_extend', '32']
-                    if arg1 == "sign_extend":
-                        return {"operation" : "sign_extend", "size" : int(arg2)}
-                    elif arg1 == "extract":
-                        return {"operation" : "extract", "start" : int(arg2[0]), "end" : int(arg2[1])}
-                    else:
-                        raise ValueError("Unknown operation: " + arg1)
-                elif func == "bvmul":
-                    arg1 = self.get_value(arg1)
-                    arg2 = self.get_value(arg2)
-                    return f"({arg1} * {arg2})"
-                elif func == "=":
-                    arg1 = self.get_value(arg1)
-                    arg2 = self.get_value(arg2)
-                    return f"({arg1} == {arg2})"
-                elif func == "bvslt":
-                    arg1 = self.get_value(arg1)
-                    arg2 = self.get_value(arg2)
-                    return f"({arg1} < {arg2})"
-                elif func == "bvurem":
-                    arg1 = self.get_value(arg1)
-                    arg2 = self.get_value(arg2)
-                    return f"({arg1} % {arg2})"
-                elif func == "bvadd":
-                    arg1 = self.get_value(arg1)
-                    arg2 = self.get_value(arg2)
-                    return f"({arg1} + {arg2})"
-                elif func == "bvsub":
-                    arg1 = self.get_value(arg1)
-                    arg2 = self.get_value(arg2)
-                    return f"({arg1} - {arg2})" 
-                elif func == "and":
-                    arg1 = self.get_value(arg1)
-                    arg2 = self.get_value(arg2)
-                    return f"({arg1} and {arg2})"
-                else:
-                    raise ValueError("Unknown operation: " + func)
-            if isinstance(tokens[0], list):
-                var = self.parse_expr(tokens[0])
-                if isinstance(var, dict) and var["operation"] == "sign_extend":
-                    arg_var = self.smt_vars[tokens[1]]
-                    return f"(int{var['size']})({arg_var})"
-                elif isinstance(var, dict) and var["operation"] == "extract":
-                    arg_var = self.smt_vars[tokens[1]]
-                    if var['end'] == 0:
-                        return f"(int{var['start'] + 1 })({arg_var})"
-                    else:
-                        raise ValueError(f"Extracting from middle of variable {var}")
-                else:
-                    raise ValueError(f"Unknown result of operation: {tokens[0]} : {var} ")
-        else:
-            raise ValueError("Unexpected token strings: " + tokens)
+        return self.parse_value(tokens).render()
+
+    def evaluate(self, expr):
+        """
+            Evaluates an expression with an explicit stack, in post order: the
+            operands are on top of values when their application is popped.
+        """
+        if isinstance(expr, str):
+            return self.get_value(expr)
+        values = []
+        todo = [(expr, False)]
+        while todo:
+            node, ready = todo.pop()
+            if isinstance(node, str):
+                values.append(self.get_value(node))
+            elif node[0] == "_":
+                # (_ bv5 32)
+                values.append(self.indexed_constant(node))
+            elif node[0] == "let":
+                raise ValueError("let inside an expression is not supported")
+            elif not ready:
+                todo.append((node, True))
+                todo.extend((arg, False) for arg in reversed(node[1:]))
+            else:
+                count = len(node) - 1
+                args = values[len(values) - count:]
+                del values[len(values) - count:]
+                values.append(self.apply(node[0], args))
+        return values[0]
+
+    def apply(self, func, args):
+        if isinstance(func, list):
+            # ['_', 'sign_extend', '32']
+            if len(func) < 3 or func[0] != "_" or func[1] not in INDEXED_OPERATORS:
+                raise ValueError(f"Unknown operation: {func}")
+            return INDEXED_OPERATORS[func[1]](self, [int(index) for index in func[2:]], args)
+        operator = OPERATORS.get(func)
+        if operator is None:
+            raise ValueError("Unknown operation: " + func)
+        return operator(self, args)
+
+    def indexed_constant(self, node):
+        if len(node) == 3 and node[1].startswith("bv"):
+            return Value.atom(node[1][2:], int(node[2]))
+        raise ValueError(f"Unexpected token: {node}")
 
     def predict_size(self, arg2):
         # need to parse the bitvector, get the top 1 to find the size
@@ -228,13 +356,20 @@ class AssertStmt(Stmt):
 
     def get_value(self, name):
         if self.is_variable(name):
+            if name not in self.smt_vars:
+                raise ValueError("Unknown variable: " + name)
             return self.smt_vars[name]
         elif self.is_bitvector(name):
-            return int(name.replace("#b", ""), 2)
+            return Value.atom(str(int(name[2:], 2)), len(name) - 2)
+        elif name.startswith("#x"):
+            return Value.atom(str(int(name[2:], 16)), 4 * (len(name) - 2))
         elif name in ["true", "false"]:
-            return name
+            return Value.atom(name)
         else:
-            raise ValueError("Unknown value: " + name)
+            # a symbol, arrays are only used through select. read_sexpr dropped the
+            # bars, the names that are not simple symbols are quoted like the other
+            # printers do, so that a Renamer finds them in the output
+            return Value.atom(quote(name, style="'"), self.program_var_sizes.get(name))
 
     def is_variable(self, name):
         if name.startswith(".def"):
@@ -246,29 +381,98 @@ class AssertStmt(Stmt):
             return True
         return False
 
-def parse_one_file(filename : str):
+    def tokens_to_string(self):
+        return self.value.render()
+
+    def pretty_print(self):
+        """
+            One conjunct per line, like the pretty printer of simplify.
+        """
+        return "\t" + "\n\t".join(value.render() for value in self.value.conjuncts or [self.value])
+
+class InferenceSimplifier():
+    '''
+    The smt2inf engine of simplify.iter_parse, renders each formula as a C like
+    expression with an AssertStmt.
+    '''
+
+    def __init__(self, profile=None):
+        self.profile = profile
+
+    def simplify(self, formula):
+        stmt = AssertStmt("ASSERT", "(assert %s)" % formula.to_smtlib(daggify=True), self.profile,
+                          symbol_widths(formula))
+        stmt.parse_value()
+        return stmt
+
+def symbol_widths(formula):
+    """
+        The bit width of every bit vector symbol of formula, by name.
+    """
+    return {symbol.symbol_name(): symbol.symbol_type().width
+            for symbol in formula.get_free_variables() if symbol.symbol_type().is_bv_type()}
+
+def cache_string(formula):
+    """
+        The cache key of formula, its dag_string followed by the widths of its
+        symbols, which the casts of the rendered assert depend on.
+    """
+    widths = symbol_widths(formula)
+    return dag_string(formula) + "\n" + " ".join("%r %d" % (name, widths[name]) for name in sorted(widths))
+
+def count_tokens(tokens):
+    """
+        Number of strings in the nested token lists.
+    """
+    count = 0
+    todo = [tokens]
+    while todo:
+        token = todo.pop()
+        if isinstance(token, list):
+            todo.extend(token)
+        else:
+            count += 1
+    return count
+
+def parse_one_file(filename : str, profile=None):
     """
-        Parse one file and return the parsed script.
+        Parse one file and return the parsed script. Only the symbols the asserts
+        refer to are declared.
     :param filename: File path.
+    :param profile: Profile that gets the time of every stage, or None.
     :return: Parsed script.
     """
     with open(filename, "r") as fp:
+        start = time.perf_counter()
         p = SmtLibParser()
-        script = p.get_script(fp)
+        script = p.get_script(open_pruned(fp))
+        if profile is not None:
+            profile.add("smt2inf pysmt parse", time.perf_counter() - start)
 
-        parse_declares(script.filter_by_command_name(["declare-fun"]))
-        parse_asserts(script.filter_by_command_name(["assert"]))
+        parse_declares(script.filter_by_command_name(["declare-fun"]), profile)
+        parse_asserts(script.filter_by_command_name(["assert"]), profile)
     print("Done Parsing")
 
-def parse_declares(stmts):
+def parse_declares(stmts, profile=None):
+    start = time.perf_counter()
     for stmt in stmts:
         dstmt = DeclStmt(stmt.args, stmt.serialize_to_string())
         print(dstmt.parse_stmt())
+    if profile is not None:
+        profile.add("smt2inf parse_declares", time.perf_counter() - start)
 
-def parse_asserts(stmts):
+def parse_asserts(stmts, profile=None):
     for stmt in stmts:
-        astmt = AssertStmt("ASSERT", stmt.serialize_to_string())
+        start = time.perf_counter()
+        serialized = stmt.serialize_to_string()
+        if profile is not None:
+            profile.add("smt2inf serialize", time.perf_counter() - start)
+        astmt = AssertStmt("ASSERT", serialized, profile, symbol_widths(stmt.args[0]))
+        parsed = time.perf_counter()
         val = astmt.parse_stmt(astmt.tokens)
+        if profile is not None:
+            profile.add("smt2inf parse_stmt", time.perf_counter() - parsed)
+            profile.add_assert(time.perf_counter() - start, len(serialized), count_tokens(astmt.tokens))
         print(val)
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+import re
+
+from array import array
+from operator import getitem
+
+'''
+Compact storage of token streams. Every distinct token string is interned once in
+a SymbolTable, and a TokenStore is an array of symbol ids, 4 bytes per token
+instead of a pointer to a string object. The serialized asserts repeat a few
+hundred distinct tokens (parens, operators, array reads), so a stream of millions
+of tokens only keeps a few hundred strings alive. The asserts of a file share one
+table, so what is computed per symbol is only computed once per file.
+
+The parens are always symbols 0 and 1, so the passes test for them by comparing
+ids instead of strings. Passes that only look at the shape of a stream work on
+its kinds, one byte per token: '(' and ')' for the parens, 'x' for anything else,
+so that they can be matched with a regex instead of a loop over the tokens.
+'''
+
+OPEN = 0
+CLOSE = 1
+
+KIND_OPEN = ord("(")
+KIND_CLOSE = ord(")")
+KIND_ATOM = ord("x")
+
+# kind -> 1 for the tokens the next token is separated from by a space
+AFTER_ATOM = bytes.maketrans(b"()x", b"\0\0\1")
+
+# a single token between parens, ( X ), X can be a paren like in the list version
+WRAPPED = re.compile(rb"\([()x]\)")
+
+class SymbolIds(dict):
+    '''
+    token string -> symbol id, a new string gets the next id and is added to the
+    lists of the table. Only the misses run Python code, so looking up a stream of
+    tokens with map stays in C.
+    '''
+
+    __slots__ = ["table"]
+
+    def __init__(self, table):
+        super().__init__()
+        self.table = table
+
+    def __missing__(self, string):
+        symbol = len(self)
+        self[string] = symbol
+        self.table.strings.append(string)
+        self.table.kinds.append(KIND_ATOM)
+        self.table.spaced.append(" " + string)
+        return symbol
+
+class SymbolTable():
+
+    __slots__ = ["ids", "strings", "kinds", "spaced", "collapsed", "merged"]
+
+    def __init__(self):
+        # symbol id -> token string, kind, and string as rendered after a token
+        # that is not a paren
+        self.strings = ["(", ")"]
+        self.kinds = bytearray([KIND_OPEN, KIND_CLOSE])
+        self.spaced = ["(", ")"]
+        self.ids = SymbolIds(self)
+        self.ids.update({"(": OPEN, ")": CLOSE})
+        # memos of Tokenizer.concatnating_arrays, symbol id -> collapsed symbol id
+        # and (symbol id, symbol id) -> merged symbol id
+        self.collapsed = []
+        self.merged = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def intern(self, string):
+        return self.ids[string]
+
+    def intern_all(self, strings):
+        '''
+        Returns an iterator over the ids of strings.
+        '''
+        return map(self.ids.__getitem__, strings)
+
+class TokenStore():
+
+    __slots__ = ["symbols", "values"]
+
+    def __init__(self, strings=(), symbols=None):
+        if symbols is None:
+            symbols = SymbolTable()
+        self.symbols = symbols
+        self.values = array("i")
+        self.extend(strings)
+
+    def extend(self, strings):
+        self.values.extend(self.symbols.intern_all(strings))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        return self.symbols.strings[self.values[i]]
+
+    def __iter__(self):
+        return map(self.symbols.strings.__getitem__, self.values)
+
+    def token_kinds(self):
+        '''
+        The kind of every token, as bytes.
+        '''
+        return bytes(map(self.symbols.kinds.__getitem__, self.values))
+
+    def render(self, start=0, end=None, kinds=None):
+        '''
+        Renders the tokens from start to end on one line, with a space before every
+        token that does not follow or is not a paren. As in the original printer,
+        the first token looks at the last one, like tokens[-1] in a list.
+
+        Every token is looked up in the plain or the spaced strings depending on the
+        kind of the token before it, kinds are the token_kinds() if already known.
+        '''
+        values = self.values
+        if end is None:
+            end = len(values)
+        if start >= end:
+            return ""
+        if kinds is None:
+            kinds = bytes(map(self.symbols.kinds.__getitem__, values[start:end]))
+        else:
+            kinds = kinds[start:end]
+        after_atom = (kinds[-1:] + kinds[:-1]).translate(AFTER_ATOM)
+        tables = (self.symbols.strings, self.symbols.spaced)
+        return "".join(map(getitem, map(tables.__getitem__, after_atom), values[start:end]))
+
+    def matching_parens(self):
+        '''
+        Returns an array with the index of the matching ')' at the index of every
+        '(', and -1 everywhere else.
+        '''
+        matching = array("i", [-1]) * len(self.values)
+        opened = []
+        for i, symbol in enumerate(self.values):
+            if symbol == OPEN:
+                opened.append(i)
+            elif symbol == CLOSE and opened:
+                matching[opened.pop()] = i
+        return matching
+
+    def remove_wrapped(self):
+        '''
+        Replaces every ( X ) by X, scanning from the left and going on after the ')'
+        of every replacement, so only one level of parens is removed.
+        '''
+        values = self.values
+        kept = array("i")
+        last = 0
+        for match in WRAPPED.finditer(self.token_kinds()):
+            start = match.start()
+            kept.extend(values[last:start])
+            kept.append(values[start + 1])
+            last = start + 3
+        if last == 0:
+            return
+        kept.extend(values[last:])
+        self.values = kept
@@ -0,0 +1,185 @@
+import json
+
+import pysmt.operators as op
+
+from .dag import EXTEND_OPERATORS, NARY_OPERATORS, ROTATE_OPERATORS, UNARY_OPERATORS
+from .simplify import read_asserts
+
+'''
+Structured output of the simplified asserts, for tools that would otherwise parse
+the rendered text again. Every assert is a record:
+
+    {"index": 0, "symbols": ["foo_arg_1", "foo_arg_2"], "nodes": [],
+     "tree": ["s<", ["range", "foo_arg_1", 3, 0], ["range", "foo_arg_2", 3, 0]]}
+
+A tree is a list [operator, operands...], with the operators of the rendered text
+(&, u<, ::, ZEXT, ...) and these leaves and special forms:
+
+    ["var", name]                   a symbol
+    ["bv", value, width]            a bit vector constant, the width the text strips
+    ["int", value]                  an integer constant
+    true, false                     boolean constants
+    ["range", array, high, low]     the bytes high..low of an array, foo_arg_1[3:0],
+                                    a single read has high == low
+    ["select", array, index]        any other array read
+    ["extract", high, low, tree]    the bits high..low of tree
+    ["ZEXT", bits, tree]            and SEXT, ROL, ROR, with their step
+    ["ref", i]                      the tree nodes[i] of the record
+
+Like the shared engine, a subterm the assert uses more than once is only written
+once: its tree goes in the nodes of the record and every use is a ref, instead of
+being inlined at every use, which grows exponentially with the depth of KLEE's let
+chains. The nodes only refer to the ones before them. Leaves and ranges are small
+and always inlined.
+
+The records are written one per line as JSON, or one after the other as msgpack
+objects (msgpack is an optional dependency), so that they can be read as a stream.
+'''
+
+# trees that are not worth a ref
+INLINED = ["var", "bv", "int", "range"]
+
+class TreeBuilder():
+    '''
+    Builds the tree of every node of the formula DAG once, like DagSimplifier.
+    Only node_type() and the accessors are used, which the nodes of pysmt and of
+    the native reader both have.
+    '''
+
+    def __init__(self, renamer=None):
+        self.memo = {}
+        # names of the symbols met by build
+        self.symbols = set()
+        # node id -> number of parents, and the trees of the shared nodes
+        self.references = {}
+        self.nodes = []
+        self.renamer = renamer
+
+    def count(self, formula):
+        '''
+        Counts the references to every node of formula, like SharedSimplifier.count.
+        '''
+        seen = {formula.node_id()}
+        stack = [formula]
+        while stack:
+            node = stack.pop()
+            for arg in node.args():
+                self.references[arg.node_id()] = self.references.get(arg.node_id(), 0) + 1
+                if arg.node_id() not in seen:
+                    seen.add(arg.node_id())
+                    stack.append(arg)
+
+    def build(self, formula):
+        stack = [formula]
+        while stack:
+            node = stack[-1]
+            if node.node_id() in self.memo:
+                stack.pop()
+                continue
+            pending = [arg for arg in node.args() if arg.node_id() not in self.memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            self.memo[node.node_id()] = self.shared(node, self.tree(node))
+        return self.memo[formula.node_id()]
+
+    def shared(self, node, tree):
+        '''
+        Moves the tree of a node used more than once to the node table, its uses
+        get a ref.
+        '''
+        if self.references.get(node.node_id(), 0) < 2 or not isinstance(tree, list) or tree[0] in INLINED:
+            return tree
+        self.nodes.append(tree)
+        return ["ref", len(self.nodes) - 1]
+
+    def name(self, node):
+        if self.renamer is None:
+            return node.symbol_name()
+        return self.renamer.rename_symbol(node.symbol_name())
+
+    def tree(self, node):
+        node_type = node.node_type()
+        args = [self.memo[arg.node_id()] for arg in node.args()]
+        if node_type == op.SYMBOL:
+            self.symbols.add(self.name(node))
+            return ["var", self.name(node)]
+        elif node_type == op.BV_CONSTANT:
+            return ["bv", node.constant_value(), node.bv_width()]
+        elif node_type == op.BOOL_CONSTANT:
+            return bool(node.constant_value())
+        elif node_type == op.INT_CONSTANT:
+            return ["int", node.constant_value()]
+        elif node_type == op.ARRAY_SELECT:
+            array, index = node.args()
+            if array.node_type() == op.SYMBOL and index.node_type() == op.BV_CONSTANT:
+                return ["range", self.name(array), index.constant_value(), index.constant_value()]
+            return ["select"] + args
+        elif node_type == op.BV_CONCAT:
+            return self.concat(args)
+        elif node_type == op.BV_EXTRACT:
+            return ["extract", node.bv_extract_end(), node.bv_extract_start(), args[0]]
+        elif node_type in EXTEND_OPERATORS:
+            return [EXTEND_OPERATORS[node_type], node.bv_extend_step(), args[0]]
+        elif node_type in ROTATE_OPERATORS:
+            return [ROTATE_OPERATORS[node_type], node.bv_rotation_step(), args[0]]
+        elif node_type in NARY_OPERATORS:
+            return [NARY_OPERATORS[node_type]] + args
+        elif node_type in UNARY_OPERATORS:
+            return [UNARY_OPERATORS[node_type], args[0]]
+        elif node_type == op.ITE:
+            return ["?"] + args
+        return [op.op_to_str(node_type)] + args
+
+    def concat(self, args):
+        '''
+        Consecutive reads of the same array collapse into one range, like
+        collapse_array_pieces foo_arg_1[3]::foo_arg_1[2:0] becomes ["range", "foo_arg_1", 3, 0].
+        '''
+        first = args[0]
+        if isinstance(first, list) and first[0] == "range":
+            for previous, arg in zip(args, args[1:]):
+                if not isinstance(arg, list) or arg[0] != "range" or arg[1] != first[1] or arg[2] != previous[3] - 1:
+                    break
+            else:
+                return ["range", first[1], first[2], args[-1][3]]
+        return ["::"] + args
+
+    def record(self, formula, index):
+        self.memo = {}
+        self.symbols = set()
+        self.references = {}
+        self.nodes = []
+        self.count(formula)
+        tree = self.build(formula)
+        return {"index": index, "symbols": sorted(self.symbols), "nodes": self.nodes, "tree": tree}
+
+def iter_records(fp, reader="pysmt", renamer=None):
+    '''
+    Yields the record of every assert in fp, as soon as each one is read.
+    '''
+    builder = TreeBuilder(renamer)
+    for index, formula in enumerate(read_asserts(fp, reader)):
+        yield builder.record(formula, index)
+
+def write_json(records, out):
+    """
+        Write every record as a line of JSON, out is a text file.
+    """
+    for record in records:
+        out.write(json.dumps(record, separators=(",", ":")))
+        out.write("\n")
+
+def write_msgpack(records, out):
+    """
+        Write every record as a msgpack object, out is a binary file. They can be
+        read back with msgpack.Unpacker(out).
+    """
+    try:
+        import msgpack
+    except ImportError:
+        raise ValueError("The msgpack format needs the msgpack package: pip install msgpack")
+    packer = msgpack.Packer()
+    for record in records:
+        out.write(packer.pack(record))
@@ -0,0 +1,7 @@
+(set-logic QF_AUFBV )
+(declare-fun a () (Array (_ BitVec 32) (_ BitVec 8) ) )
+(declare-fun x32 () (_ BitVec 32))
+(declare-fun y () (_ BitVec 64))
+(assert (bvult y (concat (select a x32) (concat (select a (_ bv1 32)) (_ bv350 48)))))
+(assert (bvult y (concat (select a (_ bv2 32)) (select a (_ bv1 32)) (_ bv350 48))))
+(assert (= (concat (select a x32) (select a (_ bv1 32))) (concat (select a (_ bv3 32)) (select a (_ bv2 32)))))
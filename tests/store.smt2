@@ -0,0 +1,6 @@
+(set-logic QF_AUFBV )
+(declare-fun a () (Array (_ BitVec 32) (_ BitVec 8) ) )
+(declare-fun i () (_ BitVec 32))
+(assert (= (select (store a i (_ bv7 8)) (_ bv0 32)) (_ bv1 8)))
+(assert (= (select (store (store a (bvadd i (_ bv1 32)) (bvadd (select a i) (_ bv1 8))) (_ bv3 32) (_ bv9 8)) i) (_ bv2 8)))
+(assert (let ((?B1 (store a i (_ bv7 8)))) (= (select ?B1 (_ bv0 32)) (select ?B1 (_ bv1 32)))))
@@ -0,0 +1,41 @@
+import io
+import os
+
+import pytest
+
+from smt2hr.simplify import parse
+
+'''
+The engines that walk the formula DAG against the Tokenizer on the fixtures, and
+the temporaries of the shared engine.
+'''
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+
+FIXTURES = ["sample.smt2", "sample2.smt2", "stiched", "store.smt2", "concat.smt2"]
+
+def read(name):
+    with open(os.path.join(TESTS, name)) as f:
+        return f.read()
+
+@pytest.mark.parametrize("reader", ["pysmt", "native"])
+@pytest.mark.parametrize("pretty", [False, True])
+@pytest.mark.parametrize("name", FIXTURES)
+def test_dag_matches_tokenizer(name, pretty, reader):
+    text = read(name)
+    expected = parse(io.StringIO(text), pretty, "tokenizer", reader=reader)
+    assert parse(io.StringIO(text), pretty, "dag", reader=reader) == expected
+
+@pytest.mark.parametrize("engine", ["tokenizer", "dag"])
+def test_store(engine):
+    rendered = parse(io.StringIO(read("store.smt2")), engine=engine)
+    assert rendered.split("\n\n") == ["(a[i := 7_8][0] = 1)",
+                                      "(a[(i + 1) :=(a[i] + 1)][3_32 := 9_8][i] = 2)",
+                                      "(a[i := 7_8][0] = a[i := 7_8][1])"]
+
+@pytest.mark.parametrize("reader", ["pysmt", "native"])
+def test_shared_store(reader):
+    rendered = parse(io.StringIO(read("store.smt2")), engine="shared", reader=reader)
+    assert rendered.split("\n\n") == ["t1 = a[i := 7_8]\n(t1[0] = 1)",
+                                      "(a[(i + 1) :=(a[i] + 1)][3_32 := 9_8][i] = 2)",
+                                      "(t1[0] = t1[1])"]
@@ -0,0 +1,65 @@
+import os
+import random
+
+import pytest
+
+from pysmt.smtlib.parser import SmtLibParser
+from smt2hr.simplify import Tokenizer
+
+'''
+Tokenizer.scan against the reference lexer, tokenize followed by
+remove_bit_width_from_tokens: both have to produce identical token streams on the
+asserts of the fixtures, on synthetic concat chains and on random strings.
+bench/bench_lexer.py times them.
+'''
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+
+FIXTURES = ["sample.smt2", "sample2.smt2", "stiched", "store.smt2", "concat.smt2"]
+
+# Characters the serialized asserts are made of, plus the ones that hit the corner cases
+ALPHABET = "()  ab_[]:'->.5813260&<u%"
+
+def reference_tokens(string):
+    tokenizer = Tokenizer("")
+    tokenizer.string = string
+    tokenizer.tokenize()
+    tokenizer.remove_bit_width_from_tokens()
+    return tokenizer.tokens
+
+def scanned_tokens(string):
+    tokenizer = Tokenizer("")
+    tokenizer.string = string
+    tokenizer.scan()
+    return list(tokenizer.tokens)
+
+def fixture_strings(name):
+    with open(os.path.join(TESTS, name), "r") as fp:
+        script = SmtLibParser().get_script(fp)
+    return [command.args[0].serialize() for command in script.filter_by_command_name(["assert"])]
+
+def synthetic_string(nasserts, width):
+    chain = "arr[0_32]"
+    for i in range(1, width):
+        chain = "(arr[%d_32]::%s)" % (i, chain)
+    ret = "(0_64 = %s)" % chain
+    for i in range(1, nasserts):
+        ret = "(%s & (%d_%d = (%s u%% 129_32)))" % (ret, i, width * 8, chain)
+    return ret
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_fixtures(name):
+    for string in fixture_strings(name):
+        assert scanned_tokens(string) == reference_tokens(string)
+
+@pytest.mark.parametrize("nasserts,width", [(10, 4), (100, 8), (10, 32)])
+def test_synthetic(nasserts, width):
+    string = synthetic_string(nasserts, width)
+    assert scanned_tokens(string) == reference_tokens(string)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random(seed):
+    rand = random.Random(seed)
+    for _ in range(2000):
+        string = "".join(rand.choice(ALPHABET) for _ in range(rand.randint(0, 40)))
+        assert scanned_tokens(string) == reference_tokens(string), string
@@ -0,0 +1,20 @@
+import io
+
+from smt2hr.simplify import parse
+
+'''
+The widths of the bit vector symbols in the C like expressions of smt2inf.
+'''
+
+QUERY = """(set-logic QF_AUFBV )
+(declare-fun a () (Array (_ BitVec 32) (_ BitVec 8) ) )
+(declare-fun x16 () (_ BitVec 16))
+(declare-fun x () (_ BitVec 8))
+(assert (bvult (concat (select a (_ bv0 32)) x16) (_ bv5 24)))
+(assert (bvult x (_ bv182 8)))
+"""
+
+def test_symbol_widths():
+    rendered = parse(io.StringIO(QUERY), engine="smt2inf")
+    assert rendered.split("\n\n") == ["((uint24)((a << 16) | x16) < (uint24)5)",
+                                      "((uint8)x < (uint8)182)"]